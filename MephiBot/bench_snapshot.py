@@ -0,0 +1,82 @@
+import argparse
+import json
+import random
+import time
+from gameinfo import GameInfo, Team
+from snapshot_format import decode_snapshot, encode_snapshot, msgpack
+
+FORMATS = [
+    ("json (старый)", None, False),
+    ("json", "json", False),
+    ("json+zlib", "json", True),
+    ("msgpack", "msgpack", False),
+    ("msgpack+zlib", "msgpack", True),
+]
+
+
+def make_game(teams_count: int, rng: random.Random) -> GameInfo:
+    locations_count = max(10, teams_count // 20)
+    location_list = [(f"Локация{i}", 3) for i in range(locations_count)]
+    location_names = [name for name, _ in location_list]
+    station_names = [f"{name}-{i}" for name, count in location_list for i in range(1, count + 1)]
+    caretakers = {100000 + i: station_name for i, station_name in enumerate(station_names)}
+
+    teams = []
+    for i in range(teams_count):
+        route = rng.sample(location_names, min(12, locations_count))
+        team = Team(f"Команда{i}", route)
+        for location_name in route[:rng.randint(0, len(route))]:
+            team.ToVisitLocation(location_name)
+        teams.append(team)
+
+    game_info = GameInfo(caretakers=caretakers, admins={1, 2, 3}, location_list=location_list,
+                         teams=teams, team_on_station=dict(), team_leaving_station=dict())
+    for station_name, team in zip(game_info.team_on_station, teams):
+        game_info.team_on_station[station_name] = team.name
+    return game_info
+
+
+def measure(func, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench(teams_count: int, repeats: int, rng: random.Random):
+    data = make_game(teams_count, rng).serialize()
+    # json stores the integer caretaker ids as string keys
+    json_data = json.loads(json.dumps(data))
+    print(f"\nКоманд: {teams_count}")
+    print(f"{'формат':<16}{'кодирование, мс':>18}{'декодирование, мс':>20}{'размер, КБ':>14}")
+
+    for title, codec, compress in FORMATS:
+        if codec == "msgpack" and msgpack is None:
+            print(f"{title:<16}{'msgpack не установлен':>52}")
+            continue
+
+        if codec is None:
+            blob = json.dumps(data).encode("utf-8")
+            encode_ms = measure(lambda: json.dumps(data), repeats)
+        else:
+            blob = encode_snapshot(data, codec, compress)
+            encode_ms = measure(lambda: encode_snapshot(data, codec, compress), repeats)
+        decode_ms = measure(lambda: GameInfo.deserialize(decode_snapshot(blob)), repeats)
+
+        assert decode_snapshot(blob) == (data if codec == "msgpack" else json_data)
+        print(f"{title:<16}{encode_ms:>18.2f}{decode_ms:>20.2f}{len(blob) / 1024:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сравнение форматов снимка игры")
+    parser.add_argument('--teams', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='Количество команд в синтетических играх')
+    parser.add_argument('--repeats', type=int, default=5, help='Количество повторов, берется лучшее время')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for teams_count in args.teams:
+        bench(teams_count, args.repeats, rng)
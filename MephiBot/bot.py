@@ -1,89 +1,88 @@
 import asyncio
 import logging
-import argparse
-from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
-from dotenv import load_dotenv
-import os
-
-
-load_dotenv()
-TOKEN = os.environ.get("TOKEN")
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(funcName)s | %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    handlers=[
-        logging.FileHandler("bot_log.txt"),
-        logging.StreamHandler()
-    ]
-)
- 
-storage = MemoryStorage()
-bot = Bot(token=TOKEN)
-dp = Dispatcher(storage=storage)
-
-parser = argparse.ArgumentParser(
-    description="Запуск бота с заданным файлом кураторов и локаций")
-parser.add_argument('--caretakers-file', type=str,
-                    help='Путь к файлу с данными кураторов', default="users.txt")
-parser.add_argument('--locations-file', type=str,
-                    help='Путь к файлу с данными локаций', default="locations.txt")
-args = parser.parse_args()
-
-
-def load_caretakers_from_file(file_path: str) -> dict[int, str]:
-    caretakers = {}
-    with open(file_path, 'r') as f:
-        for line in f:
-            user_id, station_name = line.strip().split()
-            caretakers[int(user_id)] = station_name
-    return caretakers
-
-
-def load_locations_from_file(file_path: str) -> list[tuple[str, int]]:
-    locations = []
-    with open(file_path, 'r') as f:
-        for line in f:
-            location_name, max_users = line.strip().split()
-            locations.append((location_name, int(max_users)))
-    return locations
-
-
-caretakers_data = load_caretakers_from_file(args.caretakers_file)
-location_list_data = load_locations_from_file(args.locations_file)
-
-from gameinfo import GameInfo
-
-game_info = GameInfo(
-    caretakers=caretakers_data,
-    admins={1094283106, 174924358, 783440088, 593807464},
-    location_list=location_list_data,
-    teams=[], team_on_station=dict(), team_leaving_station=dict()
-)
-
-
-restored_game_info = GameInfo.restore_game_info()  
-
-if not restored_game_info is None:
-    logging.info("Сохранение  найдено")
-    game_info.copy_from_another_instance(restored_game_info)
-else:
-    logging.info("Сохранение не найдено")
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+import valkey.asyncio
+from gameinfo import GameInfo, connection_pool
+from storage import open_event_log
+from loader import args, bot, dp, game_info, outbox, snapshot_writer, status_board
+
+
+async def refresh_shared_state(handler, event, data):
+    await game_info.SyncSharedState()
+    return await handler(event, data)
+
+
+async def restore_game():
+    if args.persistence == "shared":
+        await game_info.StartSharedState()
+        dp.update.outer_middleware(refresh_shared_state)
+        return
+
+    event_log = None
+    if args.persistence == "eventlog":
+        event_log = await open_event_log(valkey.asyncio.Valkey(connection_pool=connection_pool))
+        await game_info.SetEventLog(event_log)
+
+    restored_game_info = await GameInfo.restore_game_info(args.persistence, event_log, game_info.storage)
+
+    if not restored_game_info is None:
+        logging.info("Сохранение  найдено")
+        game_info.copy_from_another_instance(restored_game_info)
+        if game_info.storage.full_sync_needed:
+            game_info.update_game_info()
+    else:
+        logging.info("Сохранение не найдено")
+        if event_log is not None:
+            await game_info.CompactEventLog()
 
 
 from handlers import caretaker
 from handlers.admin_folder import admin
+from handlers.roles import resolve_user_role
 
 async def main():
+    await restore_game()
+
+    dp.startup.register(snapshot_writer.start)
+    dp.shutdown.register(snapshot_writer.stop)
+    dp.startup.register(outbox.start)
+    dp.shutdown.register(outbox.stop)
+    dp.startup.register(status_board.start)
+    dp.shutdown.register(status_board.stop)
+    dp.message.outer_middleware(resolve_user_role)
+    dp.callback_query.outer_middleware(resolve_user_role)
     dp.include_router(caretaker.caretaker_router)
     dp.include_router(admin.admin_router)
 
-    await bot.delete_webhook(drop_pending_updates=True)
+    if args.mode == "webhook":
+        await run_webhook()
+        return
+
+    await bot.delete_webhook(drop_pending_updates=not args.keep_pending_updates)
 
     await dp.start_polling(bot)
 
 
+async def run_webhook():
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=args.webhook_secret).register(app, path=args.webhook_path)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, args.webhook_host, args.webhook_port).start()
+        await bot.set_webhook(args.webhook_url.rstrip("/") + args.webhook_path,
+                              secret_token=args.webhook_secret,
+                              allowed_updates=dp.resolve_used_update_types(),
+                              drop_pending_updates=not args.keep_pending_updates)
+        logging.info(f"Webhook запущен на {args.webhook_host}:{args.webhook_port}{args.webhook_path}")
+
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
 if __name__ == "__main__":
     asyncio.run(main())
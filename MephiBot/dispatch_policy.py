@@ -0,0 +1,63 @@
+import random
+
+
+class DispatchPolicy():
+    name = ""
+
+    def ChooseLocation(self, game_info, team, candidates: list[str]) -> str:
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}()"
+
+
+class FirstFreePolicy(DispatchPolicy):
+    name = "first-free"
+
+    def ChooseLocation(self, game_info, team, candidates: list[str]) -> str:
+        return candidates[0]
+
+
+class LeastLoadedLocationPolicy(DispatchPolicy):
+    name = "least-loaded"
+
+    def ChooseLocation(self, game_info, team, candidates: list[str]) -> str:
+        return min(candidates, key=game_info.GetLocationLoad)
+
+
+class FewestRemainingTeamsPolicy(DispatchPolicy):
+    name = "fewest-remaining"
+
+    def ChooseLocation(self, game_info, team, candidates: list[str]) -> str:
+        return min(candidates, key=lambda location_name: (game_info.GetRemainingTeamsCount(location_name),
+                                                          game_info.GetLocationLoad(location_name)))
+
+
+class RandomPolicy(DispatchPolicy):
+    name = "random"
+
+    def __init__(self, seed: int | None = None):
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+    def ChooseLocation(self, game_info, team, candidates: list[str]) -> str:
+        return self.rng.choice(sorted(candidates))
+
+    def __repr__(self) -> str:
+        return f"RandomPolicy(seed={self.seed!r})"
+
+
+DISPATCH_POLICIES: dict[str, type[DispatchPolicy]] = {
+    policy.name: policy for policy in (FirstFreePolicy, LeastLoadedLocationPolicy,
+                                       FewestRemainingTeamsPolicy, RandomPolicy)
+}
+
+
+def make_dispatch_policy(name: str, seed: int | None = None) -> DispatchPolicy:
+    policy_cls = DISPATCH_POLICIES.get(name, None)
+    if policy_cls is None:
+        raise ValueError(f"Неизвестная политика распределения: {name}")
+
+    if policy_cls is RandomPolicy:
+        return RandomPolicy(seed)
+    return policy_cls()
@@ -0,0 +1,75 @@
+import json
+from typing import Any, Mapping
+import valkey.asyncio
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+FSM_TTL_SECONDS = 60 * 60
+
+
+class ValkeyFSMStorage(BaseStorage):
+    def __init__(self, client: valkey.asyncio.Valkey, ttl: int | None = FSM_TTL_SECONDS,
+                 key_builder: KeyBuilder | None = None):
+        self.client = client
+        self.ttl = ttl
+        self.key_builder = key_builder or DefaultKeyBuilder()
+
+    def _expire(self, pipeline, *keys: str):
+        if self.ttl:
+            for key in keys:
+                pipeline.expire(key, self.ttl)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state_key = self.key_builder.build(key, "state")
+        data_key = self.key_builder.build(key, "data")
+        state = state.state if isinstance(state, State) else state
+
+        pipeline = self.client.pipeline(transaction=True)
+        if state is None:
+            pipeline.delete(state_key)
+        else:
+            pipeline.set(state_key, state, ex=self.ttl)
+        self._expire(pipeline, data_key)
+        await pipeline.execute()
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        state = await self.client.get(self.key_builder.build(key, "state"))
+        if isinstance(state, bytes):
+            return state.decode("utf-8")
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        data_key = self.key_builder.build(key, "data")
+
+        pipeline = self.client.pipeline(transaction=True)
+        pipeline.delete(data_key)
+        if data:
+            pipeline.hset(data_key, mapping=_encode_data(data))
+            self._expire(pipeline, data_key, self.key_builder.build(key, "state"))
+        await pipeline.execute()
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return _decode_data(await self.client.hgetall(self.key_builder.build(key, "data")))
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> dict[str, Any]:
+        data_key = self.key_builder.build(key, "data")
+
+        pipeline = self.client.pipeline(transaction=True)
+        if data:
+            pipeline.hset(data_key, mapping=_encode_data(data))
+            self._expire(pipeline, data_key, self.key_builder.build(key, "state"))
+        pipeline.hgetall(data_key)
+        return _decode_data((await pipeline.execute())[-1])
+
+    async def close(self) -> None:
+        # the connection pool is shared with game info persistence and is closed with the process
+        pass
+
+
+def _encode_data(data: Mapping[str, Any]) -> dict[str, str]:
+    return {name: json.dumps(value, ensure_ascii=False) for name, value in data.items()}
+
+
+def _decode_data(data: dict) -> dict[str, Any]:
+    return {(name.decode("utf-8") if isinstance(name, bytes) else name): json.loads(value)
+            for name, value in data.items()}
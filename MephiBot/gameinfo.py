@@ -1,13 +1,24 @@
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
 from enum import StrEnum
-import json
+import asyncio
 import logging
-import valkey
+import time
+import valkey.asyncio
+from dispatch_policy import DispatchPolicy, FirstFreePolicy
+from snapshot_format import decode_snapshot, encode_snapshot
+from storage import ValkeyStorage
+from team_search import TeamNameIndex
 
-connection_pool = valkey.ConnectionPool(
+EVENTS_PER_SNAPSHOT = 500
+SHARED_COMMIT_ATTEMPTS = 10
+
+connection_pool = valkey.asyncio.ConnectionPool(
     host='localhost',
     port=6379,
     db=0,
-    max_connections=10
+    max_connections=10,
+    socket_connect_timeout=1,
+    socket_timeout=2
 )
 
 class StationStatus(StrEnum):
@@ -15,10 +26,26 @@ class StationStatus(StrEnum):
     WAITING = "Waiting"
     IN_PROGRESS = "In progress"
 
+class TransitionResult(StrEnum):
+    NO_TEAM = "No team"
+    DUPLICATE = "Duplicate"
+    NOT_ARRIVED = "Not arrived"
+    BUSY = "Busy"
+    HAS_LEAVING = "Has leaving"
+    ACCEPTED = "Accepted"
+    FINISHED = "Finished"
+    QUEUED = "Queued"
+    ALREADY_QUEUED = "Already queued"
+    SENT = "Sent"
+
 class Station():
-    def __init__(self, name: str):
+    __slots__ = ("name", "status", "location", "on_status_change")
+
+    def __init__(self, name: str, location=None):
         self.name = name
         self.status = StationStatus.FREE
+        self.location: Location | None = location
+        self.on_status_change = None
 
     def __eq__(self, other):
         if isinstance(other, Station):
@@ -38,10 +65,21 @@ class Station():
         return self.status == StationStatus.WAITING
 
     def SetStatus(self, status: StationStatus):
+        old_status = self.status
         self.status = status
+        if old_status != status and self.on_status_change is not None:
+            self.on_status_change(self, old_status)
 
     def GetName(self) -> str:
         return self.name
+
+    def GetLocation(self):
+        return self.location
+
+    def GetLocationName(self) -> str | None:
+        if self.location is None:
+            return None
+        return self.location.GetName()
     
     def __repr__(self) -> str:
         return f"Station(name={self.name!r}, status={self.status!r})"
@@ -56,22 +94,28 @@ class Station():
         }
 
     @staticmethod
-    def deserialize(data: dict):
-        station = Station(data["name"])
+    def deserialize(data: dict, location=None):
+        station = Station(data["name"], location)
         station.status = StationStatus(data["status"])  
         return station
 
 class Location():
+    __slots__ = ("name", "stations")
+
     def __init__(self, location_name: str, number_of_stations: int):
         self.name: str = location_name
         self.stations: list[Station] = []
 
         for i in range(1, number_of_stations + 1):
             station_name: str = self.name + "-" + str(i)
-            self.stations.append(Station(station_name))
+            self.stations.append(Station(station_name, self))
 
     def GetName(self) -> str:
         return self.name
+
+    def AddStation(self, station: Station):
+        station.location = self
+        self.stations.append(station)
     
     def __repr__(self) -> str:
         stations_repr = ','.join(repr(station) for station in self.stations)
@@ -90,14 +134,17 @@ class Location():
     @staticmethod
     def deserialize(data: dict):
         location = Location(data["name"], 0)  
-        location.stations = [Station.deserialize(station_data) for station_data in data["stations"]]
+        for station_data in data["stations"]:
+            location.AddStation(Station.deserialize(station_data, location))
         return location
 
 class Team():
+    __slots__ = ("name", "to_visit", "visited")
+
     def __init__(self, name: str, to_visit_list: list[str]) -> None:
         self.name = name
-        self.to_visit_list = to_visit_list
-        self.visited_list = []
+        self.to_visit: dict[str, None] = dict.fromkeys(to_visit_list)
+        self.visited: dict[str, None] = dict()
 
     def __eq__(self, other):
         if isinstance(other, Team):
@@ -107,44 +154,70 @@ class Team():
     def __hash__(self):
         return hash(self.name)
 
-    def ToVisitLocation(self, location_name: str):
-        if location_name in self.to_visit_list:
-            self.to_visit_list.remove(location_name)
-            self.visited_list.append(location_name)
+    def ToVisitLocation(self, location_name: str) -> bool:
+        if location_name not in self.to_visit:
+            return False
 
-    def AddToVisitLocation(self, location_name: str):
-        if location_name in self.visited_list:
-            self.visited_list.remove(location_name)
-            self.to_visit_list.append(location_name)
+        del self.to_visit[location_name]
+        self.visited[location_name] = None
+        return True
+
+    def AddToVisitLocation(self, location_name: str) -> bool:
+        if location_name not in self.visited:
+            return False
+
+        del self.visited[location_name]
+        self.to_visit[location_name] = None
+        return True
+
+    def AddLocation(self, location_name: str) -> bool:
+        if location_name in self.to_visit:
+            return False
+
+        self.to_visit[location_name] = None
+        return True
+
+    def RemoveLocation(self, location_name: str) -> bool:
+        if location_name not in self.to_visit:
+            return False
+
+        del self.to_visit[location_name]
+        return True
+
+    def NeedsLocation(self, location_name: str) -> bool:
+        return location_name in self.to_visit
+
+    def GetToVisitCount(self) -> int:
+        return len(self.to_visit)
 
     def GetToVisitList(self) -> list[str]:
-        return self.to_visit_list
+        return list(self.to_visit)
 
     def GetVisitedList(self) -> list[str]:
-        return self.visited_list
+        return list(self.visited)
 
     def GetName(self) -> str:
         return self.name
     
     def __repr__(self) -> str:
-        return f"Team(name={self.name!r}, to_visit_list={self.to_visit_list!r}, visited_list={self.visited_list!r})"
+        return f"Team(name={self.name!r}, to_visit_list={self.GetToVisitList()!r}, visited_list={self.GetVisitedList()!r})"
 
     def __str__(self) -> str:
-        to_visit_str = ','.join(self.to_visit_list)
-        visited_str = ','.join(self.visited_list)
+        to_visit_str = ','.join(self.to_visit)
+        visited_str = ','.join(self.visited)
         return f"{self.name} [{to_visit_str}] [{visited_str}]"
     
     def serialize(self) -> dict:
         return {
             "name": self.name,
-            "to_visit_list": self.to_visit_list,
-            "visited_list": self.visited_list
+            "to_visit_list": self.GetToVisitList(),
+            "visited_list": self.GetVisitedList()
         }
 
     @staticmethod
     def deserialize(data: dict):
         team = Team(data["name"], data["to_visit_list"])
-        team.visited_list = data["visited_list"]
+        team.visited = dict.fromkeys(data["visited_list"])
         return team
 
 
@@ -160,7 +233,48 @@ class GameInfo:
         self.team_leaving_station: dict[str, str] = dict(team_leaving_station)
         self.updates_count = 0
         self.BAD_ID = "INCORRECT_ID"
-        self.client = valkey.Valkey(connection_pool=connection_pool)
+        self.client = valkey.asyncio.Valkey(connection_pool=connection_pool)
+        self.storage = ValkeyStorage(self.client)
+        self.persistence_mode = "snapshot"
+        self.snapshot_codec = "msgpack"
+        self.snapshot_compress = True
+        self.persist_lock = asyncio.Lock()
+        self.snapshot_writer = None
+        self.status_board = None
+
+        self.dirty_meta = False
+        self.dirty_stations: set[str] = set()
+        self.dirty_teams: set[str] = set()
+        self.dirty_team_on_station: set[str] = set()
+        self.dirty_team_leaving_station: set[str] = set()
+
+        self.event_log = None
+        self.record_events = False
+        self.pending_events: list[dict] = []
+        self.transition_depth = 0
+        self.last_event_id: str | None = None
+        self.events_since_snapshot = 0
+
+        self.teams_by_name: dict[str, Team] = dict()
+        self.team_index = TeamNameIndex()
+        self.stations_by_name: dict[str, Station] = dict()
+        self.caretakers_by_station: dict[str, list[int]] = dict()
+        self.station_by_caretaker: dict[int, Station] = dict()
+        self.station_of_team: dict[str, str] = dict()
+        self.leaving_station_of_team: dict[str, str] = dict()
+        self.free_stations: dict[str, set[Station]] = dict()
+        self.locations_by_name: dict[str, Location] = dict()
+        self.remaining_teams_by_location: dict[str, int] = dict()
+        self.dispatch_policy: DispatchPolicy = FirstFreePolicy()
+        self.waiting_teams: dict[str, str | None] = dict()
+        self.has_freed_stations = False
+        self.station_locks: dict[str, asyncio.Lock] = dict()
+        self.dispatch_lock = asyncio.Lock()
+        self.shared_version: int | None = None
+        self.shared_hash_versions: dict[str, int] = dict()
+        self.structure_version = 0
+        self.teams_version = 0
+        self.locations_version = 0
 
         if not is_restored:
             for elem in location_list:
@@ -175,83 +289,600 @@ class GameInfo:
                 for station in location.stations:
                     self.team_leaving_station[station.GetName()] = None
 
-    def AddTeam(self, team_name: str):
-        to_visit_list: list[str] = [location.GetName()
-                                    for location in self.locations]
-        self.teams.add(Team(team_name, to_visit_list))
+        self.RebuildIndexes()
+        self.MarkAllDirty()
+
+    def MarkAllDirty(self):
+        self.dirty_meta = True
+        self.dirty_stations = set(self.stations_by_name)
+        self.dirty_teams = set(self.teams_by_name)
+        self.dirty_team_on_station = set(self.team_on_station)
+        self.dirty_team_leaving_station = set(self.team_leaving_station)
+
+    def ClearDirty(self):
+        self.dirty_meta = False
+        self.dirty_stations = set()
+        self.dirty_teams = set()
+        self.dirty_team_on_station = set()
+        self.dirty_team_leaving_station = set()
+
+    def TakeDirty(self) -> tuple:
+        dirty = (self.dirty_meta, self.dirty_stations, self.dirty_teams,
+                 self.dirty_team_on_station, self.dirty_team_leaving_station)
+        self.ClearDirty()
+        return dirty
+
+    def RestoreDirty(self, dirty: tuple):
+        dirty_meta, dirty_stations, dirty_teams, dirty_team_on_station, dirty_team_leaving_station = dirty
+        self.dirty_meta = self.dirty_meta or dirty_meta
+        self.dirty_stations |= dirty_stations
+        self.dirty_teams |= dirty_teams
+        self.dirty_team_on_station |= dirty_team_on_station
+        self.dirty_team_leaving_station |= dirty_team_leaving_station
+
+    def CollectChanges(self) -> dict:
+        changes = {
+            "stations": {name: self.stations_by_name[name].status.value for name in self.dirty_stations},
+            "teams": {name: {"to_visit_list": self.teams_by_name[name].GetToVisitList(),
+                             "visited_list": self.teams_by_name[name].GetVisitedList()}
+                      for name in self.dirty_teams},
+            "team_on_station": {name: self.team_on_station.get(name, None) for name in self.dirty_team_on_station},
+            "team_leaving_station": {name: self.team_leaving_station.get(name, None)
+                                     for name in self.dirty_team_leaving_station},
+        }
+
+        if self.dirty_meta:
+            changes["meta"] = {
+                "caretakers": dict(self.caretakers),
+                "admins": list(self.admins),
+                "locations": [{"name": location.GetName(),
+                               "stations": [station.GetName() for station in location.stations]}
+                              for location in self.locations],
+                "waiting_teams": dict(self.waiting_teams)
+            }
+
+        return changes
+
+    def GetStructure(self) -> tuple[set[str], set[str], set[str]]:
+        return set(self.teams_by_name), set(self.locations_by_name), set(self.stations_by_name)
+
+    def RebuildIndexes(self):
+        self.teams_by_name = {team.GetName(): team for team in self.teams}
+        self.team_index = TeamNameIndex(sorted(self.teams_by_name))
+
+        self.stations_by_name = dict()
+        self.free_stations = dict()
+        self.locations_by_name = dict()
+        for location in self.locations:
+            self.locations_by_name[location.GetName()] = location
+            self.free_stations[location.GetName()] = set()
+            for station in location.stations:
+                self.stations_by_name[station.GetName()] = station
+                station.on_status_change = self.OnStationStatusChanged
+                if station.IsFree():
+                    self.free_stations[location.GetName()].add(station)
+
+        self.remaining_teams_by_location = {location_name: 0 for location_name in self.locations_by_name}
+        for team in self.teams:
+            for location_name in team.to_visit:
+                if location_name in self.remaining_teams_by_location:
+                    self.remaining_teams_by_location[location_name] += 1
+
+        self.RebuildCaretakerIndexes()
+
+        self.station_of_team = dict()
+        for station_name, team_name in self.team_on_station.items():
+            if team_name is not None:
+                self.station_of_team[team_name] = station_name
+
+        self.leaving_station_of_team = dict()
+        for station_name, team_name in self.team_leaving_station.items():
+            if team_name is not None:
+                self.leaving_station_of_team[team_name] = station_name
+
+    def RebuildCaretakerIndexes(self):
+        self.caretakers_by_station = dict()
+        self.station_by_caretaker = dict()
+        for caretaker_id, station_name in self.caretakers.items():
+            self.caretakers_by_station.setdefault(station_name, []).append(caretaker_id)
+            station = self.stations_by_name.get(station_name, None)
+            if station is not None:
+                self.station_by_caretaker[caretaker_id] = station
+
+    def OnStationStatusChanged(self, station: Station, old_status: StationStatus):
+        free_stations = self.free_stations.get(station.GetLocationName(), None)
+        if free_stations is None:
+            return
+
+        self.dirty_stations.add(station.GetName())
+        self.RecordEvent({"e": "status", "s": station.GetName(), "v": station.status.value})
+
+        if station.IsFree():
+            free_stations.add(station)
+            self.has_freed_stations = True
+        else:
+            free_stations.discard(station)
+
+    def SetDispatchPolicy(self, dispatch_policy: DispatchPolicy):
+        self.dispatch_policy = dispatch_policy
+
+    def GetLocationLoad(self, location_name: str) -> float:
+        location = self.locations_by_name.get(location_name, None)
+        if location is None or len(location.stations) == 0:
+            return 1.0
+
+        free_count = len(self.free_stations.get(location_name, ()))
+        return 1.0 - free_count / len(location.stations)
+
+    def GetRemainingTeamsCount(self, location_name: str) -> int:
+        return self.remaining_teams_by_location.get(location_name, 0)
+
+    @contextmanager
+    def Transition(self, event: dict):
+        self.transition_depth += 1
+        try:
+            yield
+        finally:
+            self.transition_depth -= 1
+        self.RecordEvent(event)
+
+    def RecordEvent(self, event: dict):
+        if not self.record_events or self.transition_depth > 0:
+            return
+
+        event["ts"] = int(time.time())
+        self.pending_events.append(event)
+
+    def ApplyEvent(self, event: dict):
+        kind = event["e"]
+
+        if kind == "registered":
+            self.AddTeam(event["t"], event["l"])
+        elif kind == "accepted":
+            self.VisitLocation(self.teams_by_name[event["t"]], event["l"])
+        elif kind == "location_added":
+            self.AddLocationToTeam(self.teams_by_name[event["t"]], event["l"])
+        elif kind == "location_removed":
+            self.RemoveLocationFromTeam(self.teams_by_name[event["t"]], event["l"])
+        elif kind == "sent":
+            self.SendTeamOnStation(event["t"], event["s"])
+        elif kind == "removed":
+            self.RemoveTeamFromStation(event["s"])
+        elif kind == "leaving":
+            self.StartLeavingStation(event["s"])
+        elif kind == "left":
+            self.LeaveStation(event["s"])
+        elif kind == "status":
+            self.stations_by_name[event["s"]].SetStatus(StationStatus(event["v"]))
+        elif kind == "status_override":
+            self.OverrideStationStatus(event["s"], StationStatus(event["v"]))
+        elif kind == "reset":
+            self.ResetStation(event["s"])
+        elif kind == "reset_all":
+            self.ResetAllStations()
+        elif kind == "queued":
+            self.EnqueueWaitingTeam(event["t"], event["f"])
+        elif kind == "dequeued":
+            self.RemoveWaitingTeam(event["t"])
+        else:
+            logging.error(f"Неизвестное событие в журнале: {event}")
+
+    def AddTeam(self, team_name: str, to_visit_list: list[str] | None = None):
+        if to_visit_list is None:
+            to_visit_list = [location.GetName() for location in self.locations]
+        self.RecordEvent({"e": "registered", "t": team_name, "l": to_visit_list})
+        team = Team(team_name, to_visit_list)
+        self.teams.add(team)
+        self.teams_by_name[team_name] = team
+        self.team_index.Add(team_name)
+        self.structure_version += 1
+        self.teams_version += 1
+        self.dirty_teams.add(team_name)
+        for location_name in to_visit_list:
+            self.remaining_teams_by_location[location_name] += 1
+
+    def VisitLocation(self, team: Team, location_name: str):
+        if team.ToVisitLocation(location_name):
+            self.dirty_teams.add(team.GetName())
+            self.RecordEvent({"e": "accepted", "t": team.GetName(), "l": location_name})
+            if location_name in self.remaining_teams_by_location:
+                self.remaining_teams_by_location[location_name] -= 1
+
+    def AddLocationToTeam(self, team: Team, location_name: str) -> bool:
+        if not team.AddLocation(location_name):
+            return False
+
+        self.dirty_teams.add(team.GetName())
+        self.RecordEvent({"e": "location_added", "t": team.GetName(), "l": location_name})
+        if location_name in self.remaining_teams_by_location:
+            self.remaining_teams_by_location[location_name] += 1
+        return True
+
+    def RemoveLocationFromTeam(self, team: Team, location_name: str) -> bool:
+        if not team.RemoveLocation(location_name):
+            return False
+
+        self.dirty_teams.add(team.GetName())
+        self.RecordEvent({"e": "location_removed", "t": team.GetName(), "l": location_name})
+        if location_name in self.remaining_teams_by_location:
+            self.remaining_teams_by_location[location_name] -= 1
+        return True
 
     def SendTeamOnStation(self, team_name: str, station_name: str):
-        self.team_on_station[station_name] = team_name
+        with self.Transition({"e": "sent", "t": team_name, "s": station_name}):
+            self.RemoveTeamFromStation(station_name)
+            self.team_on_station[station_name] = team_name
+            self.dirty_team_on_station.add(station_name)
+            if team_name is not None:
+                self.station_of_team[team_name] = station_name
+
+    def RemoveTeamFromStation(self, station_name: str):
+        team_name = self.team_on_station.get(station_name, None)
+        if team_name is not None and self.station_of_team.get(team_name, None) == station_name:
+            del self.station_of_team[team_name]
+        self.team_on_station[station_name] = None
+        self.dirty_team_on_station.add(station_name)
+        self.RecordEvent({"e": "removed", "s": station_name})
 
     def StartLeavingStation(self, station_name: str):
-        team_name: str = self.team_on_station[station_name]
-        self.team_leaving_station[station_name] = team_name
-        self.team_on_station[station_name] = None
+        with self.Transition({"e": "leaving", "s": station_name}):
+            team_name: str = self.team_on_station[station_name]
+            self.RemoveTeamFromStation(station_name)
+            self.LeaveStation(station_name)
+            self.team_leaving_station[station_name] = team_name
+            self.dirty_team_leaving_station.add(station_name)
+            if team_name is not None:
+                self.leaving_station_of_team[team_name] = station_name
 
     def LeaveStation(self, station_name: str):
+        team_name = self.team_leaving_station.get(station_name, None)
+        if team_name is not None and self.leaving_station_of_team.get(team_name, None) == station_name:
+            del self.leaving_station_of_team[team_name]
         self.team_leaving_station[station_name] = None
+        self.dirty_team_leaving_station.add(station_name)
+        self.RecordEvent({"e": "left", "s": station_name})
+
+    def ResetStation(self, station_name: str):
+        with self.Transition({"e": "reset", "s": station_name}):
+            self.RemoveTeamFromStation(station_name)
+            self.LeaveStation(station_name)
+            self.stations_by_name[station_name].SetStatus(StationStatus.FREE)
+
+    def ResetAllStations(self):
+        with self.Transition({"e": "reset_all"}):
+            for station_name in self.stations_by_name:
+                self.ResetStation(station_name)
+
+    def OverrideStationStatus(self, station_name: str, status: StationStatus):
+        with self.Transition({"e": "status_override", "s": station_name, "v": status.value}):
+            self.stations_by_name[station_name].SetStatus(status)
 
     def GetTeamByName(self, team_name: str) -> Team | None:
-        for team in self.teams:
-            if team.GetName() == team_name:
-                return team
-        return None
+        return self.teams_by_name.get(team_name, None)
+
+    def SearchTeams(self, query: str, limit: int = 5) -> list[Team]:
+        return [self.teams_by_name[team_name] for team_name in self.team_index.Search(query, limit)]
 
     def GetStationByName(self, station_name: str) -> Station | None:
-        for location in self.locations:
-            for station in location.stations:
-                if station.GetName() == station_name:
-                    return station
-        return None
+        return self.stations_by_name.get(station_name, None)
+
+    def GetStationOfTeam(self, team_name: str) -> str | None:
+        return self.station_of_team.get(team_name, None)
+
+    def GetLeavingStationOfTeam(self, team_name: str) -> str | None:
+        return self.leaving_station_of_team.get(team_name, None)
 
     def GetNextFreeStation(self, team_name: str) -> Station | None:
-        for team_ in self.teams:
-            if team_.GetName() == team_name:
-                team = team_
+        team = self.teams_by_name.get(team_name, None)
+        if team is None:
+            return None
 
-        to_visit_list: list[str] = team.GetToVisitList()
+        candidates: list[str] = [location_name for location_name in team.to_visit
+                                 if self.free_stations.get(location_name, None)]
 
-        for location in self.locations:
-            if location.GetName() in to_visit_list:
-                for station in location.stations:
-                    if station.IsFree():
-                        return station
+        if candidates:
+            location_name = self.dispatch_policy.ChooseLocation(self, team, candidates)
+            return min(self.free_stations[location_name], key=Station.GetName)
 
-        print(f"None in GetNextFreeStation")
+        logging.info(f"Для команды {team_name} нет свободных станций")
         return None
 
+    def EnqueueWaitingTeam(self, team_name: str, from_station_name: str | None = None):
+        if team_name not in self.waiting_teams:
+            self.waiting_teams[team_name] = from_station_name
+            self.dirty_meta = True
+            self.RecordEvent({"e": "queued", "t": team_name, "f": from_station_name})
+
+    def RemoveWaitingTeam(self, team_name: str) -> bool:
+        if team_name not in self.waiting_teams:
+            return False
+
+        del self.waiting_teams[team_name]
+        self.dirty_meta = True
+        self.RecordEvent({"e": "dequeued", "t": team_name})
+        return True
+
+    def IsTeamWaiting(self, team_name: str) -> bool:
+        return team_name in self.waiting_teams
+
+    def DispatchWaitingTeams(self) -> list[tuple[str, Station, str | None]]:
+        if not self.has_freed_stations:
+            return []
+        self.has_freed_stations = False
+
+        dispatched: list[tuple[str, Station, str | None]] = []
+        for team_name, from_station_name in list(self.waiting_teams.items()):
+            team = self.teams_by_name.get(team_name, None)
+            if team is None or team.GetToVisitCount() == 0:
+                self.RemoveWaitingTeam(team_name)
+                continue
+
+            next_station = self.DispatchTeam(team_name, from_station_name)
+            if next_station is not None:
+                dispatched.append((team_name, next_station, from_station_name))
+
+        self.has_freed_stations = False
+        return dispatched
+
+    def GetStationLock(self, station_name: str) -> asyncio.Lock:
+        lock = self.station_locks.get(station_name, None)
+        if lock is None:
+            lock = self.station_locks[station_name] = asyncio.Lock()
+        return lock
+
+    @asynccontextmanager
+    async def LockStations(self, *station_names: str | None):
+        async with AsyncExitStack() as stack:
+            for station_name in sorted(set(station_names) - {None}):
+                await stack.enter_async_context(self.GetStationLock(station_name))
+            yield
+
+    @asynccontextmanager
+    async def LockTeamStations(self, team_name: str, *station_names: str | None):
+        while True:
+            team_stations = (self.GetStationOfTeam(team_name), self.GetLeavingStationOfTeam(team_name))
+            async with self.LockStations(*station_names, *team_stations):
+                if team_stations == (self.GetStationOfTeam(team_name), self.GetLeavingStationOfTeam(team_name)):
+                    yield
+                    return
+
+    async def ApplyTransition(self, transition, *args):
+        async with self.dispatch_lock:
+            if self.persistence_mode != "shared":
+                return transition(*args)
+
+            for _ in range(SHARED_COMMIT_ATTEMPTS):
+                await self.RefreshSharedState()
+                result = transition(*args)
+                if await self.CommitSharedChanges():
+                    return result
+                logging.info("Состояние игры изменено другим процессом, переход повторяется")
+
+        raise RuntimeError(f"Не удалось применить переход за {SHARED_COMMIT_ATTEMPTS} попыток")
+
+    async def CommitSharedChanges(self) -> bool:
+        changes = self.CollectChanges()
+        if not any(changes.values()):
+            return True
+
+        version = await self.storage.commit_changes(changes, self.shared_version)
+        if version is None:
+            for name, entity_changes in changes.items():
+                if entity_changes:
+                    self.shared_hash_versions.pop(name, None)
+            self.shared_version = None
+            return False
+
+        self.shared_version = version
+        self.ClearDirty()
+        return True
+
+    async def RefreshSharedState(self):
+        if self.shared_version is not None and await self.storage.get_version() == self.shared_version:
+            return
+
+        entities, hash_versions, version = await self.storage.load_changed_entities(self.shared_hash_versions)
+        if entities:
+            if not self.ApplySharedEntities(entities):
+                data, hash_versions, version = await self.storage.load_versioned_entities()
+                if data is not None:
+                    self.CopyStateFrom(GameInfo.deserialize(data))
+            self.NotifyStatusBoard()
+        self.ClearDirty()
+        self.shared_hash_versions = hash_versions
+        self.shared_version = version
+
+    def ApplySharedEntities(self, entities: dict) -> bool:
+        meta = entities.get("meta", None)
+        if meta:
+            locations = {location["name"]: location["stations"] for location in meta["locations"]}
+            if locations != {location_name: [station.GetName() for station in location.stations]
+                             for location_name, location in self.locations_by_name.items()}:
+                return False
+        if not entities.get("stations", dict()).keys() <= self.stations_by_name.keys():
+            return False
+        if "teams" in entities and not self.teams_by_name.keys() <= entities["teams"].keys():
+            return False
+
+        if meta:
+            caretakers = {int(caretaker_id): station_name for caretaker_id, station_name in meta["caretakers"].items()}
+            if caretakers != self.caretakers:
+                self.caretakers = caretakers
+                self.RebuildCaretakerIndexes()
+            self.admins = set(meta["admins"])
+            self.waiting_teams = dict(meta.get("waiting_teams", {}))
+            self.has_freed_stations = self.has_freed_stations or len(self.waiting_teams) > 0
+
+        for station_name, status in entities.get("stations", dict()).items():
+            self.stations_by_name[station_name].SetStatus(StationStatus(status))
+
+        for team_name, team_data in entities.get("teams", dict()).items():
+            self.SetTeamProgress(team_name, team_data["to_visit_list"], team_data["visited_list"])
+
+        for station_name, team_name in entities.get("team_on_station", dict()).items():
+            if self.team_on_station.get(station_name, None) != team_name:
+                self.SendTeamOnStation(team_name, station_name)
+
+        for station_name, team_name in entities.get("team_leaving_station", dict()).items():
+            if self.team_leaving_station.get(station_name, None) != team_name:
+                self.LeaveStation(station_name)
+                self.team_leaving_station[station_name] = team_name
+                if team_name is not None:
+                    self.leaving_station_of_team[team_name] = station_name
+        return True
+
+    def SetTeamProgress(self, team_name: str, to_visit_list: list[str], visited_list: list[str]):
+        team = self.teams_by_name.get(team_name, None)
+        if team is None:
+            self.AddTeam(team_name, to_visit_list)
+            self.teams_by_name[team_name].visited = dict.fromkeys(visited_list)
+            return
+        if team.GetToVisitList() == to_visit_list and team.GetVisitedList() == visited_list:
+            return
+
+        for location_name in team.to_visit:
+            if location_name in self.remaining_teams_by_location:
+                self.remaining_teams_by_location[location_name] -= 1
+        team.to_visit = dict.fromkeys(to_visit_list)
+        team.visited = dict.fromkeys(visited_list)
+        for location_name in team.to_visit:
+            if location_name in self.remaining_teams_by_location:
+                self.remaining_teams_by_location[location_name] += 1
+
+    async def SyncSharedState(self):
+        async with self.dispatch_lock:
+            await self.RefreshSharedState()
+
+    async def StartSharedState(self):
+        data, hash_versions, version = await self.storage.load_versioned_entities()
+        if data is not None:
+            self.CopyStateFrom(GameInfo.deserialize(data))
+            self.ClearDirty()
+            self.shared_hash_versions = hash_versions
+            self.shared_version = version
+            logging.info(f"Общее состояние игры загружено из Valkey, версия {version}")
+            return
+
+        self.MarkAllDirty()
+        self.shared_version = version
+        if await self.CommitSharedChanges():
+            logging.info("Общее состояние игры создано в Valkey")
+        else:
+            await self.RefreshSharedState()
+            logging.info(f"Общее состояние игры создано другим процессом, версия {self.shared_version}")
+
+    def DispatchTeam(self, team_name: str, from_station_name: str | None = None) -> Station | None:
+        next_station = self.GetNextFreeStation(team_name)
+        if next_station is None:
+            return None
+
+        self.RemoveWaitingTeam(team_name)
+        if from_station_name is not None and self.team_leaving_station.get(from_station_name, None) == team_name:
+            self.LeaveStation(from_station_name)
+        self.SendTeamOnStation(team_name, next_station.GetName())
+        next_station.SetStatus(StationStatus.WAITING)
+        return next_station
+
+    def RegisterTeam(self, team_name: str) -> tuple[TransitionResult, Station | None]:
+        if team_name in self.teams_by_name:
+            return TransitionResult.DUPLICATE, None
+
+        self.AddTeam(team_name)
+        next_station = self.DispatchTeam(team_name)
+        if next_station is None:
+            self.EnqueueWaitingTeam(team_name)
+            return TransitionResult.QUEUED, None
+        return TransitionResult.SENT, next_station
+
+    def AcceptTeam(self, station_name: str) -> tuple[TransitionResult, Team | None]:
+        station = self.stations_by_name[station_name]
+        team = self.GetCurrentTeamOnStation(station_name)
+
+        if team is None:
+            return TransitionResult.NO_TEAM, None
+        if station.IsInProgress():
+            return TransitionResult.BUSY, team
+        if self.HasLeavingTeam(station_name):
+            return TransitionResult.HAS_LEAVING, team
+
+        self.VisitLocation(team, station.GetLocationName())
+        station.SetStatus(StationStatus.IN_PROGRESS)
+        return TransitionResult.ACCEPTED, team
+
+    def RedirectTeam(self, station_name: str) -> tuple[TransitionResult, Team | None, Station | None]:
+        station = self.stations_by_name[station_name]
+
+        if not self.HasLeavingTeam(station_name):
+            team = self.GetCurrentTeamOnStation(station_name)
+            if team is None:
+                return TransitionResult.NO_TEAM, None, None
+            if not station.IsInProgress():
+                return TransitionResult.NOT_ARRIVED, team, None
+
+            self.StartLeavingStation(station_name)
+            station.SetStatus(StationStatus.FREE)
+
+        team = self.GetLeavingTeamByStation(station_name)
+        if team.GetToVisitCount() == 0:
+            self.RemoveWaitingTeam(team.GetName())
+            self.LeaveStation(station_name)
+            return TransitionResult.FINISHED, team, None
+
+        next_station = self.DispatchTeam(team.GetName(), station_name)
+        if next_station is not None:
+            return TransitionResult.SENT, team, next_station
+
+        self.LeaveStation(station_name)
+        if self.IsTeamWaiting(team.GetName()):
+            return TransitionResult.ALREADY_QUEUED, team, None
+        self.EnqueueWaitingTeam(team.GetName(), station_name)
+        return TransitionResult.QUEUED, team, None
+
+    def MoveTeamToStation(self, team_name: str, station_name: str) -> tuple[str | None, str | None]:
+        self.RemoveWaitingTeam(team_name)
+
+        prev_station_name = self.GetStationOfTeam(team_name)
+        if prev_station_name is not None and prev_station_name != station_name:
+            self.RemoveTeamFromStation(prev_station_name)
+            if not self.HasLeavingTeam(prev_station_name):
+                self.stations_by_name[prev_station_name].SetStatus(StationStatus.FREE)
+
+        leaving_station_name = self.GetLeavingStationOfTeam(team_name)
+        if leaving_station_name is not None:
+            self.LeaveStation(leaving_station_name)
+            if leaving_station_name != station_name and not self.HasTeam(leaving_station_name):
+                self.stations_by_name[leaving_station_name].SetStatus(StationStatus.FREE)
+
+        self.SendTeamOnStation(team_name, station_name)
+        station = self.stations_by_name[station_name]
+        if not station.IsInProgress():
+            station.SetStatus(StationStatus.WAITING)
+        return prev_station_name, leaving_station_name
+
     def GetStationByCaretakerID(self, caretaker_id: int) -> Station | None:
-        print(f"GetStationByCaretakerID was called")
-        station_name: str = self.caretakers.get(caretaker_id, None)
-        location_name: str = station_name[:-2]
-        for location in self.locations:
-            if location.GetName() == location_name:
-                for station in location.stations:
-                    return station
-        return None
+        return self.station_by_caretaker.get(caretaker_id, None)
 
     def GetCaretakersIDByStationName(self, station_name: str) -> list[int, int] | list[str, str]:
         id_list: list[int] = [self.BAD_ID, self.BAD_ID]
-        for id, station in self.caretakers.items():
-            if station_name == station:
-                if id_list[0] == self.BAD_ID:
-                    id_list[0] = id
-                elif id_list[1] == self.BAD_ID:
-                    id_list[1] = id
+        for i, id in enumerate(self.caretakers_by_station.get(station_name, [])[:2]):
+            id_list[i] = id
 
         return id_list
 
+    def GetCaretakersIDByLocationName(self, location_name: str) -> list[int]:
+        location = self.locations_by_name.get(location_name, None)
+        if location is None:
+            return []
+        return [caretaker_id for station in location.stations
+                for caretaker_id in self.caretakers_by_station.get(station.GetName(), [])]
+
     def GetCurrentTeamOnStation(self, station_name: str) -> Team | None:
         team_name = self.team_on_station.get(station_name, None)
 
         if team_name is None:
             return None
 
-        for team in self.teams:
-            if team.GetName() == team_name:
-                return team
-
-        return None
+        return self.teams_by_name.get(team_name, None)
 
     def GetLeavingTeamByStation(self, station_name: str) -> Team | None:
         team_name = self.team_leaving_station.get(station_name, None)
@@ -259,11 +890,7 @@ class GameInfo:
         if team_name is None:
             return None
 
-        for team in self.teams:
-            if team.GetName() == team_name:
-                return team
-
-        return None
+        return self.teams_by_name.get(team_name, None)
 
     def HasLeavingTeam(self, station_name: str) -> bool:
         if self.team_leaving_station.get(station_name, None) == None:
@@ -277,17 +904,18 @@ class GameInfo:
 
     def serialize(self) -> dict:
         return {
-            "caretakers": self.caretakers,
+            "caretakers": dict(self.caretakers),
             "admins": list(self.admins),
             "locations": [location.serialize() for location in self.locations],
             "teams": [team.serialize() for team in self.teams],
-            "team_on_station": self.team_on_station,
-            "team_leaving_station": self.team_leaving_station
+            "team_on_station": dict(self.team_on_station),
+            "team_leaving_station": dict(self.team_leaving_station),
+            "waiting_teams": dict(self.waiting_teams)
         }
 
     @staticmethod
     def deserialize(data: dict):
-        caretakers = data["caretakers"]
+        caretakers = {int(id): station_name for id, station_name in data["caretakers"].items()}
         admins = set(data["admins"])
 
         locations = set([Location.deserialize(location_data) for location_data in data["locations"]])
@@ -308,42 +936,155 @@ class GameInfo:
         )
 
         obj.locations = locations
+        obj.waiting_teams = dict(data.get("waiting_teams", {}))
+        obj.has_freed_stations = len(obj.waiting_teams) > 0
+        obj.RebuildIndexes()
+        obj.ClearDirty()
 
         return obj
 
+    def SetPersistenceMode(self, persistence_mode: str):
+        self.persistence_mode = persistence_mode
+        self.record_events = persistence_mode == "eventlog"
+
+    def SetStorage(self, storage):
+        self.storage = storage
+
+    def SetSnapshotFormat(self, codec: str, compress: bool = True):
+        self.snapshot_codec = codec
+        self.snapshot_compress = compress
+
+    async def SetEventLog(self, event_log):
+        self.event_log = event_log
+        self.last_event_id = await event_log.last_event_id()
+
+    async def FlushEvents(self, with_snapshot: bool = False):
+        async with self.persist_lock:
+            events, self.pending_events = self.pending_events, []
+            self.events_since_snapshot += len(events)
+
+            data = None
+            if with_snapshot or self.events_since_snapshot >= EVENTS_PER_SNAPSHOT:
+                data = self.serialize()
+                self.events_since_snapshot = 0
+
+            try:
+                last_event_id = await self.event_log.append(events)
+            except Exception:
+                self.pending_events = events + self.pending_events
+                raise
+            if last_event_id is not None:
+                self.last_event_id = last_event_id
+
+            if data is not None:
+                blob = await asyncio.to_thread(encode_snapshot, data, self.snapshot_codec, self.snapshot_compress)
+                await self.event_log.save_snapshot(blob, self.last_event_id)
+                logging.info(f"Снимок журнала событий сохранен, последнее событие {self.last_event_id}")
+
+    async def CompactEventLog(self):
+        await self.FlushEvents(with_snapshot=True)
+
+    def SetSnapshotWriter(self, snapshot_writer):
+        self.snapshot_writer = snapshot_writer
+
+    def SetStatusBoard(self, status_board):
+        self.status_board = status_board
+
+    def NotifyStatusBoard(self):
+        if self.status_board is not None:
+            self.status_board.Notify()
+
     def update_game_info(self):
         self.updates_count += 1
 
-        if self.updates_count >= 10:
-            json_str_repr = json.dumps(self.serialize())
+        if self.snapshot_writer is not None:
+            self.snapshot_writer.Notify(self.updates_count)
+        self.NotifyStatusBoard()
 
-            self.client.set("game_info", json_str_repr)
-            logging.info("Game info сохранены в Valkey")
-            self.updates_count = 0
+    async def save_game_info(self):
+        self.updates_count = 0
+
+        if self.persistence_mode == "eventlog":
+            self.ClearDirty()
+            await self.FlushEvents()
+            return
+
+        if self.persistence_mode == "shared":
+            return
+
+        if self.persistence_mode == "incremental":
+            async with self.persist_lock:
+                if self.storage.take_full_sync():
+                    self.MarkAllDirty()
+                changes = self.CollectChanges()
+                dirty = self.TakeDirty()
+                try:
+                    await self.storage.save_changes(changes)
+                except Exception:
+                    self.RestoreDirty(dirty)
+                    raise
+            if self.storage.full_sync_needed:
+                self.update_game_info()
+            return
+
+        async with self.persist_lock:
+            self.storage.take_full_sync()
+            blob = await asyncio.to_thread(encode_snapshot, self.serialize(), self.snapshot_codec,
+                                           self.snapshot_compress)
+            await self.storage.save_snapshot(blob)
+        logging.info("Game info сохранены")
 
     @classmethod
-    def restore_game_info(cls):
-        client = valkey.Valkey(connection_pool=connection_pool)
+    async def restore_game_info(cls, persistence_mode: str = "snapshot", event_log=None, storage=None):
+        if persistence_mode == "eventlog":
+            return await cls.restore_from_event_log(event_log)
+
+        if storage is None:
+            storage = ValkeyStorage(valkey.asyncio.Valkey(connection_pool=connection_pool))
+
+        if persistence_mode == "incremental":
+            data = await storage.load_entities()
+            if data is not None:
+                logging.info("Game info восстановлены из сохраненных сущностей")
+                return cls.deserialize(data)
 
-        json_str_repr = client.get("game_info")
+        blob = await storage.load_snapshot()
 
-        if not json_str_repr:
+        if not blob:
             logging.error("Не удалось восстановить игру, данные отсутствуют")
             return None
 
-        data = json.loads(json_str_repr)
-        return cls.deserialize(data)
+        data = await asyncio.to_thread(decode_snapshot, blob)
+        obj = cls.deserialize(data)
+        obj.MarkAllDirty()
+        return obj
+
+    @classmethod
+    async def restore_from_event_log(cls, event_log):
+        snapshot = await event_log.load_snapshot()
+
+        if snapshot is None:
+            logging.error("Не удалось восстановить игру, снимок журнала событий отсутствует")
+            return None
+
+        blob, last_event_id = snapshot
+        obj = cls.deserialize(await asyncio.to_thread(decode_snapshot, blob))
+
+        events = await event_log.read_events(last_event_id)
+        for event_id, event in events:
+            obj.ApplyEvent(event)
+            last_event_id = event_id
+
+        obj.has_freed_stations = len(obj.waiting_teams) > 0
+        obj.ClearDirty()
+        obj.last_event_id = last_event_id
+        obj.events_since_snapshot = len(events)
+        logging.info(f"Game info восстановлены из снимка и {len(events)} событий журнала")
+        return obj
     
     def copy_from_another_instance(self, another_instance):
         if isinstance(another_instance, GameInfo):
-            self.caretakers = another_instance.caretakers
-            self.admins = another_instance.admins
-            self.locations = another_instance.locations
-            self.teams = another_instance.teams
-            self.team_on_station = another_instance.team_on_station
-            self.team_leaving_station = another_instance.team_leaving_station
-            self.updates_count = another_instance.updates_count
-            self.client = another_instance.client
+            self.CopyStateFrom(another_instance)
 
         with open("info.txt", "w") as f:
             f.write(
@@ -353,7 +1094,35 @@ class GameInfo:
                 f"{self.teams}\n"
                 f"{self.team_on_station}\n"
                 f"{self.team_leaving_station}\n"
+                f"{self.waiting_teams}\n"
                 f"{self.updates_count}\n"
             )
 
+    def CopyStateFrom(self, another_instance):
+        old_teams, old_locations, old_stations = self.GetStructure()
+        self.caretakers = another_instance.caretakers
+        self.admins = another_instance.admins
+        self.locations = another_instance.locations
+        self.teams = another_instance.teams
+        self.team_on_station = another_instance.team_on_station
+        self.team_leaving_station = another_instance.team_leaving_station
+        self.updates_count = another_instance.updates_count
+        self.waiting_teams = another_instance.waiting_teams
+        self.has_freed_stations = another_instance.has_freed_stations
+        self.RebuildIndexes()
+        teams, locations, stations = self.GetStructure()
+        if teams != old_teams:
+            self.teams_version += 1
+        if locations != old_locations or stations != old_stations:
+            self.locations_version += 1
+        if (teams, locations, stations) != (old_teams, old_locations, old_stations):
+            self.structure_version += 1
+        self.dirty_meta = another_instance.dirty_meta
+        self.dirty_stations = another_instance.dirty_stations
+        self.dirty_teams = another_instance.dirty_teams
+        self.dirty_team_on_station = another_instance.dirty_team_on_station
+        self.dirty_team_leaving_station = another_instance.dirty_team_leaving_station
+        self.last_event_id = another_instance.last_event_id
+        self.events_since_snapshot = another_instance.events_since_snapshot
+
     
@@ -5,26 +5,29 @@ from aiogram.filters import BaseFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import default_state
 from aiogram.filters import StateFilter
-from aiogram.utils.keyboard import ReplyKeyboardBuilder
-from aiogram import types
-from bot import bot
-from bot import game_info
-from gameinfo import Station, StationStatus
-from bot import logging
+from loader import game_info
+from gameinfo import TransitionResult
+from loader import logging
 
 from .admin_edit import edit_router
 from .admin_read import read_router
+from .admin_broadcast import broadcast_router
 
 from .admin_fsm import *
 from ..keyboards import *
+from ..notifications import deliver_to_station_caretakers
+from ..picker import picker_router
+from ..text_dispatch import TextDispatchTable
 
 class IsAdminFilter(BaseFilter):
-    async def __call__(self, message: Message) -> bool:
-        return message.from_user.id in game_info.admins
+    async def __call__(self, message: Message, is_admin: bool = False) -> bool:
+        return is_admin
 
 admin_router = Router()
 admin_router.message.filter(IsAdminFilter())
-admin_router.include_routers(edit_router, read_router)
+admin_router.callback_query.filter(IsAdminFilter())
+admin_buttons = TextDispatchTable()
+admin_router.include_routers(broadcast_router, edit_router, read_router, picker_router)
 
 
 @admin_router.message(Command("start"), StateFilter(default_state))
@@ -33,7 +36,8 @@ async def cmd_start(message: Message):
     await message.answer(f"Привет, {message.from_user.first_name}, твоя роль - админ.\n"
                          f"Чтобы зарегистрировать команду, нажми на кнопку ниже или введи: /register\n"
                          f"Чтобы посмотреть список станций и их статус нажми на кнопку ниже или введи /stations\n"
-                         f"Чтобы посмотреть список зарегистрированных команд нажми на кнопку ниже или введи /showteams",
+                         f"Чтобы посмотреть список зарегистрированных команд нажми на кнопку ниже или введи /showteams\n"
+                         f"Чтобы отправить рассылку кураторам или админам нажми на кнопку ниже или введи /broadcast",
                          reply_markup=get_admin_menu_keyboard()
                          )
 
@@ -57,16 +61,13 @@ async def process_cancel_command_state(message: Message, state: FSMContext):
     await state.clear()
 
 
-@admin_router.message(F.text == "Зарегистрировать команду", StateFilter(default_state))
+@admin_buttons.Register("Зарегистрировать команду", default_state)
 @admin_router.message(Command("register"), StateFilter(default_state))
 async def cmd_register(message: Message, state: FSMContext):
     logging.info(f"Админ {message.from_user.id} начал процесс регистрации команды")
 
     teams_count = len(game_info.teams)
-    stations_count = 0
-
-    for location in game_info.locations:
-        stations_count += len(location.stations)
+    stations_count = len(game_info.stations_by_name)
 
     if teams_count >= stations_count:
         logging.warning(f"Админ {message.from_user.id} попытался зарегистрировать команду, \
@@ -111,48 +112,34 @@ async def cheking_correct_name(message: Message, state: FSMContext):
         await message.answer("Произошла ошибка: не удалось подтвердить регистрацию команды.")
         return
 
-    for team_ in game_info.teams:
-        if team_.GetName() == team_name:
-            logging.warning(f"Попытка зарегистрировать существующую команду: {team_name}")
-            builder = ReplyKeyboardBuilder()
-            builder.add(types.KeyboardButton(text="Зарегистрировать команду"))
-            await state.clear()
-            await message.answer(f"Произошла ошибка: команда с таким именем уже зарегистрирована.\n"
-                                 f"Если хотите - нажмите кнопку для повторной регистрации\n"
-                                 f"Или напишите: /register",
-                                 reply_markup=builder.as_markup(resize_keyboard=True),)
-            return
-
-    game_info.AddTeam(team_name)
-    logging.info(f"Команда {team_name} успешно зарегистрирована")
-
-    next_station: Station = game_info.GetNextFreeStation(team_name)
+    result, next_station = await game_info.ApplyTransition(game_info.RegisterTeam, team_name)
 
-    if next_station is None:
-        logging.error("Все станции заняты, невозможно отправить команду на станцию")
+    if result == TransitionResult.DUPLICATE:
+        logging.warning(f"Попытка зарегистрировать существующую команду: {team_name}")
         await state.clear()
-        await message.answer("Произошла ошибка: Все станции заняты.")
+        await message.answer(f"Произошла ошибка: команда с таким именем уже зарегистрирована.\n"
+                             f"Если хотите - нажмите кнопку для повторной регистрации\n"
+                             f"Или напишите: /register",
+                             reply_markup=get_register_keyboard())
         return
 
-    team = game_info.GetTeamByName(team_name)
-    location_name: str = next_station.GetName()[:-2]
-
-    game_info.SendTeamOnStation(team.GetName(), next_station.GetName())
-    next_station.SetStatus(StationStatus.WAITING)
-    logging.info(f"Команда {team_name} отправлена на станцию {next_station.GetName()}")
-
-    next_caretakers_id: tuple[int, int] = game_info.GetCaretakersIDByStationName(next_station.GetName())
+    logging.info(f"Команда {team_name} успешно зарегистрирована")
 
-    next_caretaker_id_1 = next_caretakers_id[0]
-    next_caretaker_id_2 = next_caretakers_id[1]
+    if result == TransitionResult.QUEUED:
+        logging.warning(f"Все станции заняты, команда {team_name} добавлена в очередь ожидания")
+        await state.clear()
+        await message.answer(f"Команда {team_name} зарегистрирована, но все станции заняты.\n"
+                             f"Она добавлена в очередь ожидания и будет автоматически направлена на первую освободившуюся станцию, "
+                             f"об этом придет сообщение.",
+                             reply_markup=get_admin_menu_keyboard())
+        game_info.update_game_info()
+        return
 
-    if next_caretaker_id_1 != game_info.BAD_ID:
-        logging.info(f"Найден куратор с id {next_caretaker_id_1} к нему идет команда {team_name}")
-        await bot.send_message(next_caretaker_id_1, f"На вашу станцию направлена команда {team_name}")
+    logging.info(f"Команда {team_name} отправлена на станцию {next_station.GetName()}")
 
-    if next_caretaker_id_2 != game_info.BAD_ID:
-        logging.info(f"Найден куратор с id {next_caretaker_id_2} к нему идет команда {team_name}")
-        await bot.send_message(next_caretaker_id_2, f"На вашу станцию направлена команда {team_name}")
+    report = await deliver_to_station_caretakers(next_station.GetName(), text=f"На вашу станцию направлена команда {team_name}")
+    if not report.IsComplete():
+        await message.answer(f"Не удалось уведомить кураторов станции {next_station.GetName()}, сообщите им о команде {team_name} сами.")
 
     await state.clear()
 
@@ -186,22 +173,4 @@ async def cheking_not_correct_name(message: Message, state: FSMContext):
     )
 
 
-@admin_router.message(Command("secretSHAYTANmethod"))
-async def secretSHAYTANmethod(message: Message):
-
-    # for id in game_info.admins:
-    #     print(id)
-    # for id in game_info.admins:
-    #     await bot.send_message(id, text= f"Привет, это проверочное сообщение. Оно должно прийти всем админам и смотрителям станций.")
-
-    for id, station_name in game_info.caretakers.items():
-        print(id, station_name)
-        if id == 863291546:
-                await bot.send_message(id, text= f"Привет, это проверочное сообщение. Оно должно прийти всем админам и смотрителям станций."
-                                       f"\nТвоя станция - {station_name}")
-
-
-    
-
-    # for id, station_name in game_info.caretakers.items():
-    #     await bot.send_message(id, text= f"Привет, это проверочное сообщение. Оно должно прийти всем смотрителям станций.\nТвоя станция - {station_name}")
\ No newline at end of file
+admin_buttons.Attach(admin_router)
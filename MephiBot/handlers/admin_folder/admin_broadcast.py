@@ -0,0 +1,186 @@
+import asyncio
+import time
+from aiogram import Router, F
+from aiogram.filters.command import Command
+from aiogram.types import Message, ReplyKeyboardRemove
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import default_state
+from aiogram.filters import StateFilter
+from aiogram.exceptions import TelegramAPIError
+from loader import game_info, logging, outbox
+from outbox import DeliveryReport
+
+from .admin_fsm import *
+from ..keyboards import *
+from ..filters import LocationNameFilter
+from ..text_dispatch import TextDispatchTable
+
+BROADCAST_CONCURRENCY = 4
+PROGRESS_INTERVAL_SECONDS = 3
+MAX_FAILED_IN_SUMMARY = 20
+
+TARGET_ALL_CARETAKERS = "Всем кураторам"
+TARGET_LOCATION_CARETAKERS = "Кураторам локации"
+TARGET_ADMINS = "Всем админам"
+
+broadcast_router = Router()
+broadcast_buttons = TextDispatchTable()
+broadcast_tasks: set[asyncio.Task] = set()
+
+
+def get_broadcast_recipients(target: str, location_name: str | None) -> list[int]:
+    if target == TARGET_ALL_CARETAKERS:
+        return list(game_info.caretakers.keys())
+    if target == TARGET_LOCATION_CARETAKERS:
+        return game_info.GetCaretakersIDByLocationName(location_name)
+    return list(game_info.admins)
+
+
+def get_target_description(target: str, location_name: str | None) -> str:
+    if target == TARGET_LOCATION_CARETAKERS:
+        return f"кураторам локации {location_name}"
+    return target.lower()
+
+
+def format_progress(report: DeliveryReport, total: int) -> str:
+    return (f"Рассылка: обработано {report.GetProcessedCount()} из {total}\n"
+            f"Доставлено: {len(report.delivered)}, не доставлено: {len(report.failed)}")
+
+
+def format_summary(report: DeliveryReport, total: int, elapsed: float) -> str:
+    text = (f"Рассылка завершена за {elapsed:.1f} с\n"
+            f"Доставлено: {len(report.delivered)} из {total}, не доставлено: {len(report.failed)}")
+    if not report.IsComplete():
+        failed = [str(user_id) for user_id in list(report.failed)[:MAX_FAILED_IN_SUMMARY]]
+        text += f"\n\nНе удалось отправить: {', '.join(failed)}"
+        if len(report.failed) > MAX_FAILED_IN_SUMMARY:
+            text += f" и еще {len(report.failed) - MAX_FAILED_IN_SUMMARY}"
+    return text
+
+
+async def edit_progress(progress: Message, text: str):
+    try:
+        await progress.edit_text(text)
+    except TelegramAPIError as e:
+        logging.warning(f"Не удалось обновить прогресс рассылки: {e}")
+
+
+async def run_broadcast(progress: Message, recipients: list[int], text: str):
+    report = DeliveryReport()
+    semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+    started_at = time.monotonic()
+
+    async def deliver(user_id: int):
+        async with semaphore:
+            await outbox.DeliverReported(report, user_id, text)
+
+    delivery = asyncio.gather(*(deliver(user_id) for user_id in recipients))
+    last_progress = format_progress(report, len(recipients))
+    while not delivery.done():
+        await asyncio.wait({delivery}, timeout=PROGRESS_INTERVAL_SECONDS)
+        current_progress = format_progress(report, len(recipients))
+        if not delivery.done() and current_progress != last_progress:
+            await edit_progress(progress, current_progress)
+            last_progress = current_progress
+
+    elapsed = time.monotonic() - started_at
+    logging.info(f"Рассылка завершена: доставлено {len(report.delivered)}, не доставлено {len(report.failed)}")
+    await edit_progress(progress, format_summary(report, len(recipients), elapsed))
+
+
+@broadcast_buttons.Register("Сделать рассылку", default_state)
+@broadcast_router.message(Command("broadcast"), StateFilter(default_state))
+async def broadcast_start(message: Message, state: FSMContext):
+    logging.info(f"Админ {message.from_user.id} начал рассылку")
+    await state.set_state(FSMBroadcast.choose_target)
+    await message.answer("Выберите, кому отправить рассылку.\nЕсли хотите отменить действие напишите /cancel",
+                         reply_markup=get_broadcast_target_keyboard())
+
+
+@broadcast_router.message(StateFilter(FSMBroadcast.choose_target), F.text == TARGET_LOCATION_CARETAKERS)
+async def broadcast_choose_location_target(message: Message, state: FSMContext):
+    await state.update_data(target=message.text)
+    await state.set_state(FSMBroadcast.choose_location)
+    await message.answer("Выберите локацию, кураторам которой нужно отправить рассылку",
+                         reply_markup=get_location_keyboard())
+
+
+@broadcast_router.message(StateFilter(FSMBroadcast.choose_target), F.text.in_({TARGET_ALL_CARETAKERS, TARGET_ADMINS}))
+async def broadcast_choose_target(message: Message, state: FSMContext):
+    await state.update_data(target=message.text, location_name=None)
+    await state.set_state(FSMBroadcast.enter_text)
+    await message.answer("Введите текст рассылки", reply_markup=ReplyKeyboardRemove())
+
+
+@broadcast_router.message(StateFilter(FSMBroadcast.choose_target))
+async def broadcast_invalid_target(message: Message):
+    await message.answer("Выберите получателей, нажав на кнопку, или напишите /cancel",
+                         reply_markup=get_broadcast_target_keyboard())
+
+
+@broadcast_router.message(StateFilter(FSMBroadcast.choose_location), LocationNameFilter())
+async def broadcast_choose_location(message: Message, state: FSMContext):
+    await state.update_data(location_name=message.text)
+    await state.set_state(FSMBroadcast.enter_text)
+    await message.answer("Введите текст рассылки", reply_markup=ReplyKeyboardRemove())
+
+
+@broadcast_router.message(StateFilter(FSMBroadcast.choose_location))
+async def broadcast_invalid_location(message: Message):
+    await message.answer("Вы ввели некорректное название локации, выберите локацию еще раз или напишите /cancel",
+                         reply_markup=get_location_keyboard())
+
+
+@broadcast_router.message(StateFilter(FSMBroadcast.enter_text), F.text)
+async def broadcast_enter_text(message: Message, state: FSMContext):
+    data = await state.update_data(text=message.text)
+    recipients = get_broadcast_recipients(data["target"], data["location_name"])
+
+    if len(recipients) == 0:
+        await state.clear()
+        await message.answer("Получателей рассылки не найдено, рассылка отменена.",
+                             reply_markup=get_admin_menu_keyboard())
+        return
+
+    await state.set_state(FSMBroadcast.accept_info)
+    await message.answer(f"Рассылка {get_target_description(data['target'], data['location_name'])}, "
+                         f"получателей: {len(recipients)}.\n\n{message.text}\n\nОтправить? Напишите Да или Нет",
+                         reply_markup=get_yes_no_keyboard())
+
+
+@broadcast_router.message(StateFilter(FSMBroadcast.enter_text))
+async def broadcast_invalid_text(message: Message):
+    await message.answer("Рассылка поддерживает только текст, введите сообщение еще раз или напишите /cancel")
+
+
+@broadcast_router.message(StateFilter(FSMBroadcast.accept_info), F.text.lower() == "да")
+async def broadcast_accept(message: Message, state: FSMContext):
+    data = await state.get_data()
+    await state.clear()
+
+    recipients = list(dict.fromkeys(get_broadcast_recipients(data["target"], data["location_name"])))
+    logging.info(f"Админ {message.from_user.id} запустил рассылку "
+                 f"{get_target_description(data['target'], data['location_name'])}, получателей: {len(recipients)}")
+
+    await message.answer("Рассылка запущена, прогресс будет обновляться в сообщении ниже.",
+                         reply_markup=get_admin_menu_keyboard())
+    progress = await message.answer(format_progress(DeliveryReport(), len(recipients)))
+
+    task = asyncio.create_task(run_broadcast(progress, recipients, data["text"]))
+    broadcast_tasks.add(task)
+    task.add_done_callback(broadcast_tasks.discard)
+
+
+@broadcast_router.message(StateFilter(FSMBroadcast.accept_info), F.text.lower() == "нет")
+async def broadcast_cancel(message: Message, state: FSMContext):
+    await state.clear()
+    await message.answer("Рассылка отменена.", reply_markup=get_admin_menu_keyboard())
+
+
+@broadcast_router.message(StateFilter(FSMBroadcast.accept_info))
+async def broadcast_invalid_accept(message: Message):
+    await message.answer("Напишите Да, чтобы отправить рассылку, или Нет, чтобы отменить",
+                         reply_markup=get_yes_no_keyboard())
+
+
+broadcast_buttons.Attach(broadcast_router)
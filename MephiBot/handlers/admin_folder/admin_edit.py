@@ -1,30 +1,30 @@
 from aiogram import Router, F
 from aiogram.filters.command import Command
-from aiogram.types import Message
+from aiogram.types import CallbackQuery, Message
 from aiogram.filters import BaseFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import default_state
 from aiogram.filters import StateFilter
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
 from aiogram import types
-from bot import bot
-from bot import game_info
+from loader import game_info
 from gameinfo import Station, StationStatus
-from bot import logging
+from loader import logging
 
 from .admin_fsm import *
 from ..keyboards import *
+from ..filters import LocationNameFilter, TeamNameFilter
+from ..notifications import notify_station_caretakers
+from ..picker import *
+from ..text_dispatch import TextDispatchTable
+from ..waiting_queue import dispatch_waiting_teams
 
 class IsStationNameFilter(BaseFilter):
     async def __call__(self, message: Message) -> bool:
-        for location in game_info.locations:
-            for station in location.stations:
-                if message.text == station.GetName():
-                    return True
-        
-        return False
+        return game_info.GetStationByName(message.text) is not None
 
 edit_router= Router()
+edit_buttons = TextDispatchTable()
 
 
 @edit_router.message(Command("cancel"), StateFilter(FSMStationStatusChange))
@@ -34,45 +34,52 @@ async def cancel_status_change(message: Message, state: FSMContext):
     await message.answer(f"Процесс изменения статуса станции был отменен. Вы можете начать процесс снова, отправив команду /changestatus", 
                          reply_markup=get_admin_menu_keyboard())
     
-@edit_router.message(F.text == "Редактировать станцию у команды")
+@edit_buttons.Register("Редактировать станцию у команды")
 @edit_router.message(Command("edit_team_station"), StateFilter(default_state))
 async def edit_team_station(message: Message, state: FSMContext):
     await state.set_state(FSMEditTeamStation.choose_team)
-    await message.answer(f"Выберете команду для которой хотите поменять станцию", 
-                         reply_markup=get_team_keyboard())
+    await answer_with_picker(message, state, f"Выберете команду для которой хотите поменять станцию", KIND_TEAM)
 
-@edit_router.message(StateFilter(FSMEditTeamStation.choose_team), 
-                      lambda message: message.text in [team.GetName() for team in game_info.teams])
+@edit_router.message(StateFilter(FSMEditTeamStation.choose_team), TeamNameFilter())
 async def edit_team_station_correct_team(message: Message, state: FSMContext):
     await state.update_data(team_name= message.text)
     await state.set_state(FSMEditTeamStation.choose_location)
-    await message.answer(f"Вы выбрали команду {message.text}, если вы ошиблись напишите /cancel\n"
-                         f"Если ваш выбор корректен, выберете локацию, на которую хотите отправить команду", 
-                         reply_markup=get_location_keyboard())
+    await answer_with_picker(message, state,
+                             f"Вы выбрали команду {message.text}, если вы ошиблись напишите /cancel\n"
+                             f"Если ваш выбор корректен, выберете локацию, на которую хотите отправить команду",
+                             KIND_LOCATION)
+
+@edit_router.callback_query(StateFilter(FSMEditTeamStation.choose_team), PickerCallback.filter(
+    (F.action == ACTION_SELECT) & (F.kind == KIND_TEAM)))
+async def edit_team_station_pick_team(callback: CallbackQuery, callback_data: PickerCallback, state: FSMContext):
+    await select_picked_item(callback, callback_data, state, edit_team_station_correct_team)
 
 @edit_router.message(StateFilter(FSMEditTeamStation.choose_team))
 async def edit_team_station_invalid_team(message: Message, state: FSMContext):
-    await message.answer(f"Вы отправили что-то некорректное, выберете команду заново", 
-                         reply_markup=get_team_keyboard())
+    await answer_with_picker(message, state, f"Вы отправили что-то некорректное, выберете команду заново",
+                             KIND_TEAM, prefix=message.text)
 
-@edit_router.message(StateFilter(FSMEditTeamStation.choose_location), 
-                      lambda message: message.text in [location.GetName() for location in game_info.locations])
+@edit_router.message(StateFilter(FSMEditTeamStation.choose_location), LocationNameFilter())
 async def edit_team_station_correct_location(message: Message, state: FSMContext):
     await state.update_data(location_name= message.text)
     await state.set_state(FSMEditTeamStation.choose_station)
 
     location_name: str = message.text
 
-    reply_markup = get_stations_by_location_keyboard(location_name)
+    await answer_with_picker(message, state,
+                             f"Вы выбрали локацию {location_name}, если вы ошиблись напишите /cancel\n"
+                             f"Если ваш выбор корректен, выберете станцию, на которую хотите отправить команду",
+                             KIND_STATION)
 
-    await message.answer(f"Вы выбрали локацию {location_name}, если вы ошиблись напишите /cancel\n"
-                         f"Если ваш выбор корректен, выберете станцию, на которую хотите отправить команду", 
-                         reply_markup=reply_markup)
+@edit_router.callback_query(StateFilter(FSMEditTeamStation.choose_location), PickerCallback.filter(
+    (F.action == ACTION_SELECT) & (F.kind == KIND_LOCATION)))
+async def edit_team_station_pick_location(callback: CallbackQuery, callback_data: PickerCallback, state: FSMContext):
+    await select_picked_item(callback, callback_data, state, edit_team_station_correct_location)
 
 @edit_router.message(StateFilter(FSMEditTeamStation.choose_location))
 async def edit_team_station_invalid_location(message: Message, state: FSMContext):
-    await message.answer(f"Вы отправили что-то некорректное, выберете локацию заново", 
-                         reply_markup=get_location_keyboard())
+    await answer_with_picker(message, state, f"Вы отправили что-то некорректное, выберете локацию заново",
+                             KIND_LOCATION, prefix=message.text)
 
 
 
@@ -83,12 +90,11 @@ async def edit_team_station_choose_station(message: Message, state: FSMContext):
     station_name = message.text
     team_name = data.get("team_name")
 
-    reply_markup = get_stations_by_location_keyboard(location_name)
-
-    if station_name[:-2] != location_name:
-        await message.answer(f"Вы выбрали локацию {location_name}, но в качестве станции указали {station_name}. \
-                             Данная станция не соответствует выбранной локации, выберете станцию еще раз", 
-                             reply_markup=reply_markup)
+    if game_info.GetStationByName(station_name).GetLocationName() != location_name:
+        await answer_with_picker(message, state,
+                                 f"Вы выбрали локацию {location_name}, но в качестве станции указали {station_name}. "
+                                 f"Данная станция не соответствует выбранной локации, выберете станцию еще раз",
+                                 KIND_STATION)
         return
     
     await state.update_data(station_name= station_name)
@@ -97,14 +103,16 @@ async def edit_team_station_choose_station(message: Message, state: FSMContext):
                           reply_markup=get_yes_no_keyboard())
 
 
+@edit_router.callback_query(StateFilter(FSMEditTeamStation.choose_station), PickerCallback.filter(
+    (F.action == ACTION_SELECT) & (F.kind == KIND_STATION)))
+async def edit_team_station_pick_station(callback: CallbackQuery, callback_data: PickerCallback, state: FSMContext):
+    await select_picked_item(callback, callback_data, state, edit_team_station_choose_station)
+
+
 @edit_router.message(StateFilter(FSMEditTeamStation.choose_station))
 async def edit_team_station_invalid_name(message: Message, state: FSMContext):
-    data = await state.get_data()
-    location_name = data.get("location_name")
-    reply_markup = get_stations_by_location_keyboard(location_name)
-
-    await message.answer(f"Вы ввели что-то некорректное попробуйте выбрать название станции еще раз", 
-                         reply_markup= reply_markup)
+    await answer_with_picker(message, state, f"Вы ввели что-то некорректное попробуйте выбрать название станции еще раз",
+                             KIND_STATION, prefix=message.text)
 
 @edit_router.message(StateFilter(FSMEditTeamStation.accept_info), 
                       lambda message: message.text.lower() in ["да", "нет"])
@@ -114,56 +122,15 @@ async def edit_team_station_accept_choice(message: Message, state: FSMContext):
     station_name = data.get("station_name")
     
     if message.text.lower() == "да":
+        async with game_info.LockTeamStations(team_name, station_name):
+            prev_station_name, leaving_station_name = await game_info.ApplyTransition(
+                game_info.MoveTeamToStation, team_name, station_name)
 
+        notify_station_caretakers(prev_station_name, leaving_station_name,
+                                  text=f"Админ убрал команду {team_name} с вашей станции.")
+        notify_station_caretakers(station_name,
+                                  text=f"Админ переназначил команду на вашей станции, теперь это {team_name}.")
 
-        for prev_station_name, team_name_ in game_info.team_on_station.items():
-            if team_name == team_name_:
-                game_info.team_on_station[prev_station_name] = None
-                station_ = game_info.GetStationByName(prev_station_name)
-
-                if not game_info.HasLeavingTeam(prev_station_name):
-                    station_.SetStatus(StationStatus.FREE)
-
-                caretaker_id: list[int] = game_info.GetCaretakersIDByStationName(prev_station_name)
-
-                if caretaker_id[0] != game_info.BAD_ID:
-                    await bot.send_message(caretaker_id[0], 
-                                           text=f"Админ убрал команду {team_name} с вашей станции.")
-
-                if caretaker_id[1] != game_info.BAD_ID:
-                    await bot.send_message(caretaker_id[1], 
-                                            text=f"Админ убрал команду {team_name} с вашей станции.")
-
-        for prev_station_name, team_name_ in game_info.team_leaving_station.items():
-            if team_name == team_name_:
-                game_info.team_leaving_station[prev_station_name] = None
-                station_ = game_info.GetStationByName(prev_station_name)
-
-                if not game_info.HasTeam(prev_station_name):
-                    station_.SetStatus(StationStatus.FREE)
-
-                caretaker_id: list[int] = game_info.GetCaretakersIDByStationName(prev_station_name)
-
-                if caretaker_id[0] != game_info.BAD_ID:
-                    await bot.send_message(caretaker_id[0], 
-                                           text=f"Админ убрал команду {team_name} с вашей станции.")
-
-                if caretaker_id[1] != game_info.BAD_ID:
-                    await bot.send_message(caretaker_id[1],  
-                                           text=f"Админ убрал команду {team_name} с вашей станции.")
-
-            
-        caretaker_id: list[int] = game_info.GetCaretakersIDByStationName(station_name)
-
-        if caretaker_id[0] != game_info.BAD_ID:
-            await bot.send_message(caretaker_id[0], 
-                                   text=f"Админ переназначил команду на вашей станции, теперь это {team_name}.")
-
-        if caretaker_id[1] != game_info.BAD_ID:
-            await bot.send_message(caretaker_id[1],
-                                    text=f"Админ переназначил команду на вашей станции, теперь это {team_name}..")
-        game_info.team_on_station[station_name] = team_name
-        
         await message.answer(f"Вы успешно назначили команде {team_name} станцию {station_name}. \
                              ОБЯЗАТЕЛЬНО передайте данную информацию команде, иначе она об этом не узнает",
                              reply_markup=get_admin_menu_keyboard())
@@ -174,6 +141,7 @@ async def edit_team_station_accept_choice(message: Message, state: FSMContext):
 
     await state.clear()
     game_info.update_game_info()  
+    await dispatch_waiting_teams()
 
 @edit_router.message(StateFilter(FSMEditTeamStation.accept_info))
 async def edit_team_station_invalid_accept(message: Message, state: FSMContext):
@@ -186,7 +154,7 @@ async def edit_team_station_invalid_accept(message: Message, state: FSMContext):
 
 
 
-@edit_router.message(F.text == "Редактировать список локаций для опр. команды")
+@edit_buttons.Register("Редактировать список локаций для опр. команды")
 @edit_router.message(Command(commands='edit_command_stations'))
 async def cmd_edit_stations(message: Message, state: FSMContext):
     if len(game_info.teams) == 0:
@@ -256,8 +224,8 @@ async def add_station(message: Message, state: FSMContext):
         await state.clear()
         return
 
-    if location_name not in team.to_visit_list:
-        team.to_visit_list.append(location_name)
+    if await game_info.ApplyTransition(lambda: game_info.AddLocationToTeam(game_info.GetTeamByName(team_name),
+                                                                           location_name)):
         await message.answer(f"Станция {location_name} добавлена в список станций для посещения команды {team_name}.\n\n"
                              f"Если хотите попробовать еще раз нажмите кнопку или напишите /edit_command_stations",
                                reply_markup=get_admin_menu_keyboard())
@@ -267,6 +235,7 @@ async def add_station(message: Message, state: FSMContext):
                              reply_markup=get_admin_menu_keyboard())
 
     await state.clear()
+    game_info.update_game_info()  
 
 
 @edit_router.message(FSMEditStation.removing_station)
@@ -287,11 +256,8 @@ async def remove_station(message: Message, state: FSMContext):
         await state.clear()
         return
 
-    to_visit_list: list[str] = team.GetToVisitList()
-
-    if location_name in to_visit_list:
-        team.to_visit_list.remove(location_name)
-
+    if await game_info.ApplyTransition(lambda: game_info.RemoveLocationFromTeam(game_info.GetTeamByName(team_name),
+                                                                                location_name)):
         await message.answer(f"Локация {location_name} удалена из списка станций для посещения команды {team_name}.\n\n"
                              f"Если хотите попробовать еще раз нажмите кнопку или напишите /edit_command_stations",
                                reply_markup=get_admin_menu_keyboard())
@@ -312,13 +278,12 @@ async def cancel_editing(message: Message, state: FSMContext):
     await state.clear()
 
 @edit_router.message(Command("changestatus"), StateFilter(default_state))
-@edit_router.message(F.text == "Изменить статус станции", StateFilter(default_state))
+@edit_buttons.Register("Изменить статус станции", default_state)
 async def cmd_change_status(message: Message, state: FSMContext):
     logging.info(
         f"Админ {message.from_user.id} начал процесс изменения статуса станции")
 
-    await message.answer("Выберите станцию, статус которой вы хотите изменить:", 
-                         reply_markup=get_station_selection_keyboard())
+    await answer_with_picker(message, state, "Выберите станцию, статус которой вы хотите изменить:", KIND_STATION)
     await state.set_state(FSMStationStatusChange.choose_station)
 
 
@@ -329,7 +294,8 @@ async def process_station_selected(message: Message, state: FSMContext):
 
     if station is None:
         logging.warning(f"Админ {message.from_user.id} выбрал некорректное название станции: {selected_station_name}")
-        await message.answer("Станция не найдена. Пожалуйста, выберите корректное название станции.")
+        await answer_with_picker(message, state, "Станция не найдена. Пожалуйста, выберите корректное название станции.",
+                                 KIND_STATION, prefix=selected_station_name)
         return
 
     await state.update_data(station_name=selected_station_name)
@@ -338,6 +304,12 @@ async def process_station_selected(message: Message, state: FSMContext):
     await state.set_state(FSMStationStatusChange.choose_status)
 
 
+@edit_router.callback_query(StateFilter(FSMStationStatusChange.choose_station), PickerCallback.filter(
+    (F.action == ACTION_SELECT) & (F.kind == KIND_STATION)))
+async def process_station_picked(callback: CallbackQuery, callback_data: PickerCallback, state: FSMContext):
+    await select_picked_item(callback, callback_data, state, process_station_selected)
+
+
 @edit_router.message(StateFilter(FSMStationStatusChange.choose_status), F.text)
 async def process_status_selected(message: Message, state: FSMContext):
     status_map = {
@@ -364,13 +336,15 @@ async def process_status_selected(message: Message, state: FSMContext):
         await state.clear()
         return
 
-    station.SetStatus(new_status)
+    async with game_info.LockStations(station_name):
+        await game_info.ApplyTransition(game_info.OverrideStationStatus, station_name, new_status)
     logging.info(f"Админ {message.from_user.id} изменил статус станции {station_name} на {new_status.name}")
 
     await state.clear()
     await message.answer(f"Статус станции {station_name} успешно изменен на {selected_status_text}.", 
                          reply_markup=get_admin_menu_keyboard())
     game_info.update_game_info()  
+    await dispatch_waiting_teams()
 
 
 
@@ -395,7 +369,7 @@ async def warning_invalid_status(message: Message):
     )
 
 
-@edit_router.message(F.text == "Сбросить команды на всех станциях")
+@edit_buttons.Register("Сбросить команды на всех станциях")
 @edit_router.message(Command("reset_all_stations_teams"), StateFilter(default_state))
 async def reset_all_stations_teams_query(message: Message, state: FSMContext):
     await state.set_state(FSMResetAllStationsTeams.accept_info)
@@ -410,37 +384,13 @@ async def reset_all_stations_teams_action(message: Message, state: FSMContext):
         await message.answer("Действие отменено.", reply_markup=get_admin_menu_keyboard())
         return
 
-    for station_name, team_name in game_info.team_on_station.items():
-        game_info.team_on_station[station_name] = None
-
-        station = game_info.GetStationByName(station_name)
-        station.SetStatus(StationStatus.FREE)
-
-        caretaker_id: list[int] = game_info.GetCaretakersIDByStationName(station_name)
-
-        if caretaker_id[0] != game_info.BAD_ID:
-            await bot.send_message(caretaker_id[0],
-                                    text=f"Админ сбросил команду, которая идет на вашу станцию или выполняет на ней задание.")
-
-        if caretaker_id[1] != game_info.BAD_ID:
-            await bot.send_message(caretaker_id[1], 
-                                   text=f"Админ сбросил команду, которая идет на вашу станцию или выполняет на ней задание.")
-
-    for station_name, team_name in game_info.team_leaving_station.items():
-        game_info.team_leaving_station[station_name] = None
-
-        station = game_info.GetStationByName(station_name)
-        station.SetStatus(StationStatus.FREE)
-
-        caretaker_id: list[int] = game_info.GetCaretakersIDByStationName(station_name)
+    async with game_info.LockStations(*game_info.stations_by_name):
+        await game_info.ApplyTransition(game_info.ResetAllStations)
 
-        if caretaker_id[0] != game_info.BAD_ID:
-            await bot.send_message(caretaker_id[0], 
-                                   text=f"Админ сбросил команду, которая покидает вашу станцию.")
-
-        if caretaker_id[1] != game_info.BAD_ID:
-            await bot.send_message(caretaker_id[1], 
-                                   text=f"Админ сбросил команду, которая покидает вашу станцию.")
+    notify_station_caretakers(*game_info.team_on_station.keys(),
+                              text=f"Админ сбросил команду, которая идет на вашу станцию или выполняет на ней задание.")
+    notify_station_caretakers(*game_info.team_leaving_station.keys(),
+                              text=f"Админ сбросил команду, которая покидает вашу станцию.")
 
     logging.info("У всех станций были очищены команды на них")
     await message.answer(
@@ -452,31 +402,35 @@ async def reset_all_stations_teams_action(message: Message, state: FSMContext):
 
     await state.clear()
     game_info.update_game_info()  
+    await dispatch_waiting_teams()
 
 
-@edit_router.message(F.text == "Сбросить команды на конкретной станции", StateFilter(default_state))
+@edit_buttons.Register("Сбросить команды на конкретной станции", default_state)
 @edit_router.message(Command("reset_selected_station"), StateFilter(default_state))
 async def reset_selected_station(message: Message, state: FSMContext):
-    await message.answer(f"Сначала выберете локацию у которой хотите сбросить команды", reply_markup=get_location_keyboard())
     await state.set_state(FSMResetSelectedStation.choose_location)
+    await answer_with_picker(message, state, f"Сначала выберете локацию у которой хотите сбросить команды", KIND_LOCATION)
 
-@edit_router.message(StateFilter(FSMResetSelectedStation.choose_location), 
-                      lambda message: message.text in [location.GetName() for location in game_info.locations])
+@edit_router.message(StateFilter(FSMResetSelectedStation.choose_location), LocationNameFilter())
 async def reset_selected_station_choose_location(message: Message, state: FSMContext):
     await state.update_data(location_name = message.text)
-    
-    reply_markup = get_stations_by_location_keyboard(message.text)
-
     await state.set_state(FSMResetSelectedStation.choose_station)
-    await message.answer(f"Вы выбрали локацию {message.text}, далее выберете станцию из данной локации.\n"
-                         f"Если хотите отменить действие напишите /cancel", 
-                         reply_markup=reply_markup)
+    await answer_with_picker(message, state,
+                             f"Вы выбрали локацию {message.text}, далее выберете станцию из данной локации.\n"
+                             f"Если хотите отменить действие напишите /cancel",
+                             KIND_STATION)
+
+@edit_router.callback_query(StateFilter(FSMResetSelectedStation.choose_location), PickerCallback.filter(
+    (F.action == ACTION_SELECT) & (F.kind == KIND_LOCATION)))
+async def reset_selected_station_pick_location(callback: CallbackQuery, callback_data: PickerCallback, state: FSMContext):
+    await select_picked_item(callback, callback_data, state, reset_selected_station_choose_location)
 
 @edit_router.message(StateFilter(FSMResetSelectedStation.choose_location))
 async def reset_selected_station_invalid_location_name(message: Message, state: FSMContext):
-    await message.answer(f"Вы ввели некорректное название локации, если хотите отменить процесс, то напишите /cancel\n"
-                         f"Если вы хотите выбрать локацию еще раз, то нажмите кнопку", 
-                         reply_markup=get_location_keyboard())
+    await answer_with_picker(message, state,
+                             f"Вы ввели некорректное название локации, если хотите отменить процесс, то напишите /cancel\n"
+                             f"Если вы хотите выбрать локацию еще раз, то нажмите кнопку",
+                             KIND_LOCATION, prefix=message.text)
 
 @edit_router.message(StateFilter(FSMResetSelectedStation.choose_station), IsStationNameFilter())
 async def reset_selected_station_choose_station(message: Message, state: FSMContext):
@@ -487,14 +441,17 @@ async def reset_selected_station_choose_station(message: Message, state: FSMCont
     await message.answer(f"Вы выбрали станцию {station_name}, Вы уверены ?", 
                          reply_markup= get_yes_no_keyboard())
 
+@edit_router.callback_query(StateFilter(FSMResetSelectedStation.choose_station), PickerCallback.filter(
+    (F.action == ACTION_SELECT) & (F.kind == KIND_STATION)))
+async def reset_selected_station_pick_station(callback: CallbackQuery, callback_data: PickerCallback, state: FSMContext):
+    await select_picked_item(callback, callback_data, state, reset_selected_station_choose_station)
+
 @edit_router.message(StateFilter(FSMResetSelectedStation.choose_station))
 async def reset_selected_station_invalid_station(message: Message, state: FSMContext):
-    data = await state.get_data()
-    location_name = data.get(location_name)
-
-    await message.answer(f"Вы ввели некорректное название станции, если хотите отменить процесс - напишите /cancel\n"
-                         f"Если вы хотите попробовать еще раз, то веберете заново название станции", 
-                         reply_markup=get_stations_by_location_keyboard(location_name))
+    await answer_with_picker(message, state,
+                             f"Вы ввели некорректное название станции, если хотите отменить процесс - напишите /cancel\n"
+                             f"Если вы хотите попробовать еще раз, то веберете заново название станции",
+                             KIND_STATION, prefix=message.text)
 
 @edit_router.message(StateFilter(FSMResetSelectedStation.accept_info), 
                       lambda message: message.text.lower() in ["да",  "нет"])
@@ -505,21 +462,10 @@ async def reset_selected_station_accept_info(message: Message, state: FSMContext
     await state.clear()
 
     if message.text.lower() == "да":
-        game_info.team_on_station[station_name] = None
-        game_info.team_leaving_station[station_name] = None
-
-        station = game_info.GetStationByName(station_name)
-        station.SetStatus(StationStatus.FREE)
-
-        caretaker_id: list[int] = game_info.GetCaretakersIDByStationName(station_name)
+        async with game_info.LockStations(station_name):
+            await game_info.ApplyTransition(game_info.ResetStation, station_name)
 
-        if caretaker_id[0] != game_info.BAD_ID:
-            await bot.send_message(caretaker_id[0], 
-                                   text=f"Админ сбросил команду, которая покидает вашу станцию.")
-
-        if caretaker_id[1] != game_info.BAD_ID:
-            await bot.send_message(caretaker_id[1], 
-                                   text=f"Админ сбросил команду, которая покидает вашу станцию.")
+        notify_station_caretakers(station_name, text=f"Админ сбросил команду, которая покидает вашу станцию.")
         
         await message.answer(f"Вы успешно сбросили команды на станции {station_name}"
                              f"ВНИМАНИЕ !!! Не забудьте назначить командам, которые находились сейчас на данной станции следующую\n"
@@ -529,6 +475,7 @@ async def reset_selected_station_accept_info(message: Message, state: FSMContext
         await message.answer(f"Процесс сброса команд на станции {station_name} был отменен", reply_markup=get_admin_menu_keyboard())
     
     game_info.update_game_info()  
+    await dispatch_waiting_teams()
 
     
 @edit_router.message(StateFilter(FSMResetSelectedStation.accept_info))
@@ -540,5 +487,4 @@ async def reset_selected_station_accept_info_invalid(message: Message, state: FS
                          f"Вы хотите сбросить команды на станции {station_name} ?", reply_markup=get_yes_no_keyboard())
 
 
-
-    
\ No newline at end of file
+edit_buttons.Attach(edit_router)
@@ -31,3 +31,10 @@ class FSMResetSelectedStation(StatesGroup):
     choose_location = State()
     choose_station = State()
     accept_info = State()
+
+class FSMBroadcast(StatesGroup):
+    choose_target = State()
+    choose_location = State()
+    enter_text = State()
+    accept_info = State()
+
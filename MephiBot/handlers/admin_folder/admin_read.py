@@ -1,25 +1,26 @@
 from aiogram import Router, F
-from aiogram.filters.command import Command
-from aiogram.types import Message
-from aiogram.filters import BaseFilter
+from aiogram.filters.command import Command, CommandObject
+from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
-from aiogram.fsm.state import default_state
 from aiogram.filters import StateFilter
-from aiogram.utils.keyboard import ReplyKeyboardBuilder
-from aiogram import types
-from bot import bot
-from bot import game_info
-from gameinfo import Station, StationStatus
-from bot import logging
+from loader import game_info, status_board
+from gameinfo import Team
+from loader import logging
 
 from .admin_fsm import *
 from ..keyboards import *
+from ..filters import TeamNameFilter
+from ..picker import *
+from ..text_dispatch import TextDispatchTable
+
+TEAM_SEARCH_LIMIT = 5
 
 read_router = Router()
+read_buttons = TextDispatchTable()
 
 
 @read_router.message(Command("showteams"))
-@read_router.message(F.text == "Получить инфо о команде")
+@read_buttons.Register("Получить инфо о команде")
 async def cmd_show_teams(message: Message):
     logging.info(f"Админ {message.from_user.id} запросил список команд")
 
@@ -27,11 +28,12 @@ async def cmd_show_teams(message: Message):
         logging.warning(f"Админ {message.from_user.id} запросил список команд, но оказалось, что ни одной команды не было зарегистрировано")
         await message.answer(f"Пока что ни одной команды не было зарегистрировано")
         return
-    await message.answer(f"Выберите команду, о которой вы хотите получить информацию",
+    await message.answer(f"Выберите команду, о которой вы хотите получить информацию\n"
+                         f"Или найдите ее по части названия: /team <название>",
                          reply_markup=get_team_keyboard())
 
 
-@read_router.message(lambda msg: msg.text in [team.GetName() for team in game_info.teams])
+@read_router.message(TeamNameFilter())
 async def cmd_answer_show_teams(message: Message):
     team_name: str = message.text
     logging.info(
@@ -46,8 +48,7 @@ async def cmd_answer_show_teams(message: Message):
     list_answer: list[str] = team.GetToVisitList()
     unpacked_list_answer = ", ".join(list_answer)
 
-    string_ans_representation: str = f"Команде {
-        team_name} осталось посетить локации: {unpacked_list_answer}"
+    string_ans_representation: str = f"Команде {team_name} осталось посетить локации: {unpacked_list_answer}"
 
     if len(string_ans_representation) > 0:
         await message.answer(string_ans_representation,
@@ -57,45 +58,75 @@ async def cmd_answer_show_teams(message: Message):
         await message.answer(f"Что-то пошло не так")
 
 
+def describe_team_position(team: Team) -> str:
+    team_name = team.GetName()
+    station_name = game_info.GetStationOfTeam(team_name)
+    if station_name is not None:
+        return f"на станции {station_name}"
+
+    leaving_station_name = game_info.GetLeavingStationOfTeam(team_name)
+    if leaving_station_name is not None:
+        return f"покидает станцию {leaving_station_name}"
+
+    if game_info.IsTeamWaiting(team_name):
+        return "в очереди ожидания"
+    if team.GetToVisitCount() == 0:
+        return "прошла все локации"
+    return "без станции"
+
+
+@read_router.message(Command("team"))
+async def cmd_search_team(message: Message, command: CommandObject):
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer("Напишите часть названия команды после команды, например: /team Ракета")
+        return
+
+    teams = game_info.SearchTeams(query, TEAM_SEARCH_LIMIT)
+    logging.info(f"Админ {message.from_user.id} искал команду '{query}', найдено {len(teams)}")
+
+    if len(teams) == 0:
+        await message.answer(f"Команды, похожие на '{query}', не найдены")
+        return
+
+    answer = [f"Найденные команды по запросу '{query}':"]
+    for team in teams:
+        to_visit = ", ".join(team.GetToVisitList()) or "нет"
+        answer.append(f"\n{team.GetName()} - {describe_team_position(team)}\n"
+                      f"Осталось посетить локации: {to_visit}")
+    await message.answer("\n".join(answer))
+
+
 @read_router.message(Command("stations"))
-@read_router.message(F.text == "Статус станций")
+@read_buttons.Register("Статус станций")
 async def cmd_show_stations(message: Message):
-    logging.info(f"Админ {message.from_user.id} запросил состояние станций")
-
-    status_emojis = {
-        StationStatus.FREE: "🟢 Свободна",
-        StationStatus.WAITING: "🟡 Ожидание",
-        StationStatus.IN_PROGRESS: "🔴 В процессе"
-    }
+    logging.info(f"Админ {message.from_user.id} открыл табло станций")
+    await status_board.Subscribe(message.chat.id)
+    await message.answer("Табло выше будет обновляться само при изменении статусов станций.\n"
+                         "Чтобы перестать его обновлять, напишите /board_stop",
+                         reply_markup=get_admin_menu_keyboard())
 
-    answer_repr = "📍 Состояние станций\n\n"
 
-    for location in game_info.locations:
-        answer_repr += f"{location.GetName()}\n"
-        for station in location.stations:
-            status_text = status_emojis.get(
-                station.status, "Неизвестный статус")
-            answer_repr += f"- {station.GetName()}: {status_text}\n"
-        answer_repr += "\n"
+@read_router.message(Command("board_stop"))
+async def cmd_stop_board(message: Message):
+    if not status_board.IsSubscribed(message.chat.id):
+        await message.answer("Табло станций сейчас не обновляется")
+        return
 
-    if len(answer_repr.strip()) > 0:
-        logging.info(
-            f"Админу {message.from_user.id} был показан статус станций")
-        await message.answer(answer_repr)
-    else:
-        logging.warning(f"Админ { message.from_user.id} запросил состояние станций, но ни одной станции не было зарегистрировано")
-        await message.answer("Пока еще не было зарегистрировано ни одной станции.")
+    await status_board.Unsubscribe(message.chat.id)
+    logging.info(f"Админ {message.from_user.id} отключил обновление табло станций")
+    await message.answer("Табло станций больше не будет обновляться. Чтобы открыть его снова, напишите /stations")
 
 
 @read_router.message(Command("showstationteams"))
-@read_router.message(F.text == "Показать команды на станции")
+@read_buttons.Register("Показать команды на станции")
 async def cmd_show_station_teams(message: Message, state: FSMContext):
     logging.info(
         f"Админ {message.from_user.id} начал процесс выбора станции для показа команд")
 
-    await message.answer("Выберите станцию, для которой вы хотите посмотреть список команд:",
-                         reply_markup=get_station_selection_keyboard())
     await state.set_state(FSMShowStationTeams.choose_station)
+    await answer_with_picker(message, state, "Выберите станцию, для которой вы хотите посмотреть список команд:",
+                             KIND_STATION)
 
 
 @read_router.message(StateFilter(FSMShowStationTeams.choose_station), F.text)
@@ -107,7 +138,8 @@ async def process_station_selected(message: Message, state: FSMContext):
 
     if station is None:
         logging.warning(f"Админ {message.from_user.id} выбрал некорректное название станции: {selected_station_name}")
-        await message.answer("Станция не найдена. Пожалуйста, выберите корректное название станции.")
+        await answer_with_picker(message, state, "Станция не найдена. Пожалуйста, выберите корректное название станции.",
+                                 KIND_STATION, prefix=selected_station_name)
         return
 
     current_team = game_info.GetCurrentTeamOnStation(selected_station_name)
@@ -134,6 +166,12 @@ async def process_station_selected(message: Message, state: FSMContext):
                          reply_markup=get_admin_menu_keyboard())
 
 
+@read_router.callback_query(StateFilter(FSMShowStationTeams.choose_station), PickerCallback.filter(
+    (F.action == ACTION_SELECT) & (F.kind == KIND_STATION)))
+async def pick_station_for_teams(callback: CallbackQuery, callback_data: PickerCallback, state: FSMContext):
+    await select_picked_item(callback, callback_data, state, process_station_selected)
+
+
 @read_router.message(StateFilter(FSMShowStationTeams.choose_station))
 async def warning_invalid_station(message: Message):
     logging.warning(
@@ -145,15 +183,16 @@ async def warning_invalid_station(message: Message):
     )
 
 
-@read_router.message(F.text == "Найти команды без станций")
+@read_buttons.Register("Найти команды без станций")
 @read_router.message(Command("find_teams_without_station"))
 async def find_teams_without_station(message: Message):
     teams_without_station: set[str] = set()
 
     for team in game_info.teams:
-        if len(team.GetToVisitList()) > 0:
-            if not (team.GetName() in game_info.team_on_station.values()) \
-                    and not (team.GetName() in game_info.team_leaving_station.values()):
+        if team.GetToVisitCount() > 0:
+            if game_info.GetStationOfTeam(team.GetName()) is None \
+                    and game_info.GetLeavingStationOfTeam(team.GetName()) is None \
+                    and not game_info.IsTeamWaiting(team.GetName()):
                 teams_without_station.add(team.GetName())
 
     if len(teams_without_station) == 0:
@@ -162,3 +201,6 @@ async def find_teams_without_station(message: Message):
 
     await message.answer(f"Вот список команд у которых не назначено ни одной станции\n"
                          f"{list(teams_without_station)}", reply_markup=get_admin_menu_keyboard())
+
+
+read_buttons.Attach(read_router)
@@ -0,0 +1,13 @@
+from aiogram.filters import BaseFilter
+from aiogram.types import Message
+from loader import game_info
+
+
+class TeamNameFilter(BaseFilter):
+    async def __call__(self, message: Message) -> bool:
+        return message.text in game_info.teams_by_name
+
+
+class LocationNameFilter(BaseFilter):
+    async def __call__(self, message: Message) -> bool:
+        return message.text in game_info.locations_by_name
@@ -1,8 +1,23 @@
+from functools import cache
 from aiogram import types
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
+from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
-from bot import game_info
+from loader import game_info
 
+keyboard_cache: dict[tuple, tuple[int, ReplyKeyboardMarkup]] = dict()
+
+
+def get_versioned_keyboard(key: tuple, build) -> ReplyKeyboardMarkup:
+    cached = keyboard_cache.get(key, None)
+    if cached is not None and cached[0] == game_info.structure_version:
+        return cached[1]
+
+    keyboard = build()
+    keyboard_cache[key] = (game_info.structure_version, keyboard)
+    return keyboard
+
+
+@cache
 def get_yes_no_keyboard() -> ReplyKeyboardMarkup:
     keyboard = ReplyKeyboardMarkup(
         keyboard=[
@@ -13,6 +28,7 @@ def get_yes_no_keyboard() -> ReplyKeyboardMarkup:
     return keyboard
 
 
+@cache
 def get_admin_menu_keyboard() -> ReplyKeyboardMarkup:
     keyboard = ReplyKeyboardMarkup(
         keyboard=[
@@ -22,20 +38,33 @@ def get_admin_menu_keyboard() -> ReplyKeyboardMarkup:
             [KeyboardButton(text="Показать команды на станции"), KeyboardButton(text="Изменить статус станции")], [
                 KeyboardButton(text="Редактировать список локаций для опр. команды"), KeyboardButton(text="Сбросить команды на всех станциях")],
             [KeyboardButton(text="Редактировать станцию у команды"), KeyboardButton(text="Найти команды без станций")],
-            [KeyboardButton(text="Сбросить команды на конкретной станции")]
+            [KeyboardButton(text="Сбросить команды на конкретной станции"), KeyboardButton(text="Сделать рассылку")]
         ],
         resize_keyboard=True
     )
     return keyboard
 
+@cache
+def get_broadcast_target_keyboard() -> ReplyKeyboardMarkup:
+    builder = ReplyKeyboardBuilder()
+    builder.add(KeyboardButton(text="Всем кураторам"))
+    builder.add(KeyboardButton(text="Кураторам локации"))
+    builder.add(KeyboardButton(text="Всем админам"))
+    builder.adjust(1)
+    return builder.as_markup(resize_keyboard=True)
+
 def get_team_keyboard() -> ReplyKeyboardMarkup:
+    return get_versioned_keyboard(("teams",), build_team_keyboard)
+
+
+def build_team_keyboard() -> ReplyKeyboardMarkup:
     builder = ReplyKeyboardBuilder()
-    for team in game_info.teams:
-        builder.add(KeyboardButton(text=team.GetName()))
+    builder.add(*(KeyboardButton(text=team.GetName()) for team in game_info.teams))
     builder.adjust(4)
     return builder.as_markup(resize_keyboard=True)
 
 
+@cache
 def get_edit_action_keyboard() -> ReplyKeyboardMarkup:
     builder = ReplyKeyboardBuilder()
     builder.add(KeyboardButton(text="Добавить станцию"))
@@ -45,21 +74,17 @@ def get_edit_action_keyboard() -> ReplyKeyboardMarkup:
 
 
 def get_location_keyboard() -> ReplyKeyboardMarkup:
-    builder = ReplyKeyboardBuilder()
-    for location in game_info.locations:
-        builder.add(KeyboardButton(text=location.GetName()))
-    builder.adjust(4)
-    return builder.as_markup(resize_keyboard=True)
+    return get_versioned_keyboard(("locations",), build_location_keyboard)
+
 
-def get_station_selection_keyboard() -> ReplyKeyboardMarkup:
+def build_location_keyboard() -> ReplyKeyboardMarkup:
     builder = ReplyKeyboardBuilder()
-    for location in game_info.locations:
-        for station in location.stations:
-            builder.add(types.KeyboardButton(text=station.GetName()))
+    builder.add(*(KeyboardButton(text=location.GetName()) for location in game_info.locations))
     builder.adjust(4)
     return builder.as_markup(resize_keyboard=True)
 
 
+@cache
 def get_status_selection_keyboard() -> ReplyKeyboardMarkup:
     builder = ReplyKeyboardBuilder()
     builder.add(KeyboardButton(text="🟢 Свободна"))
@@ -69,12 +94,39 @@ def get_status_selection_keyboard() -> ReplyKeyboardMarkup:
     return builder.as_markup(resize_keyboard=True)
 
 def get_stations_by_location_keyboard(location_name: str) -> ReplyKeyboardMarkup:
+    return get_versioned_keyboard(("stations_by_location", location_name),
+                                  lambda: build_stations_by_location_keyboard(location_name))
+
+
+def build_stations_by_location_keyboard(location_name: str) -> ReplyKeyboardMarkup:
     builder = ReplyKeyboardBuilder()
 
-    for location in game_info.locations:
-        if location.GetName() == location_name:
-            for station in location.stations:
-                builder.add(types.KeyboardButton(text=station.GetName()))
-    
+    location = game_info.locations_by_name.get(location_name, None)
+    if location is not None:
+        builder.add(*(types.KeyboardButton(text=station.GetName()) for station in location.stations))
+
     builder.adjust(3)
     return builder.as_markup(resize_keyboard=True)
+
+
+@cache
+def get_register_keyboard() -> ReplyKeyboardMarkup:
+    builder = ReplyKeyboardBuilder()
+    builder.add(KeyboardButton(text="Зарегистрировать команду"))
+    return builder.as_markup(resize_keyboard=True)
+
+
+@cache
+def get_caretaker_start_keyboard() -> ReplyKeyboardMarkup:
+    builder = ReplyKeyboardBuilder()
+    builder.add(KeyboardButton(text="Начать или продолжить работать со станцией"))
+    return builder.as_markup(resize_keyboard=True)
+
+
+@cache
+def get_caretaker_menu_keyboard() -> ReplyKeyboardMarkup:
+    builder = ReplyKeyboardBuilder()
+    builder.add(KeyboardButton(text="Принять новую команду"))
+    builder.add(KeyboardButton(text="Перенаправить текущую команду"))
+    builder.adjust(2)
+    return builder.as_markup(resize_keyboard=True)
@@ -0,0 +1,28 @@
+from loader import game_info, logging, outbox
+from outbox import DeliveryReport
+
+
+def get_station_caretakers_id(*station_names: str) -> list[int]:
+    caretakers_id: list[int] = []
+    for station_name in station_names:
+        if station_name is None:
+            continue
+        caretakers_id.extend(caretaker_id for caretaker_id in game_info.GetCaretakersIDByStationName(station_name)
+                             if caretaker_id != game_info.BAD_ID)
+    return caretakers_id
+
+
+def notify_users(user_ids, text: str):
+    for user_id in dict.fromkeys(user_ids):
+        outbox.Send(user_id, text)
+
+
+def notify_station_caretakers(*station_names: str, text: str):
+    notify_users(get_station_caretakers_id(*station_names), text)
+
+
+async def deliver_to_station_caretakers(*station_names: str, text: str) -> DeliveryReport:
+    report = await outbox.Fanout(get_station_caretakers_id(*station_names), text)
+    for user_id, error in report.failed.items():
+        logging.warning(f"Не удалось доставить уведомление пользователю {user_id}: {error!r}")
+    return report
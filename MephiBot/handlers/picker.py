@@ -0,0 +1,153 @@
+from aiogram import Router, F
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters.callback_data import CallbackData
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
+from loader import game_info
+
+PICKER_PAGE_SIZE = 10
+PICKER_COLUMNS = 2
+
+KIND_TEAM = "t"
+KIND_LOCATION = "l"
+KIND_STATION = "s"
+
+ACTION_PAGE = "p"
+ACTION_SELECT = "s"
+ACTION_NOOP = "n"
+
+picker_items_cache: dict[tuple, tuple[int, list[str]]] = dict()
+
+
+class PickerCallback(CallbackData, prefix="pk"):
+    kind: str
+    action: str
+    page: int = 0
+    index: int = -1
+    version: int = 0
+
+
+def get_picker_version(kind: str) -> int:
+    return game_info.teams_version if kind == KIND_TEAM else game_info.locations_version
+
+
+def get_picker_items(kind: str, location_name: str | None = None) -> list[str]:
+    key = (kind, location_name)
+    version = get_picker_version(kind)
+    cached = picker_items_cache.get(key, None)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    if kind == KIND_TEAM:
+        items = sorted(game_info.teams_by_name)
+    elif kind == KIND_LOCATION:
+        items = sorted(game_info.locations_by_name)
+    elif location_name is not None:
+        location = game_info.locations_by_name.get(location_name, None)
+        items = [] if location is None else sorted(station.GetName() for station in location.stations)
+    else:
+        items = sorted(game_info.stations_by_name)
+
+    picker_items_cache[key] = (version, items)
+    return items
+
+
+def build_picker_keyboard(kind: str, page: int = 0, location_name: str | None = None,
+                          prefix: str | None = None) -> InlineKeyboardMarkup:
+    items = get_picker_items(kind, location_name)
+    indexed_items = list(enumerate(items))
+    if prefix:
+        prefix = prefix.lower()
+        indexed_items = [(index, name) for index, name in indexed_items if name.lower().startswith(prefix)]
+
+    pages_count = max(1, (len(indexed_items) + PICKER_PAGE_SIZE - 1) // PICKER_PAGE_SIZE)
+    page = min(max(page, 0), pages_count - 1)
+    version = get_picker_version(kind)
+
+    rows: list[list[InlineKeyboardButton]] = []
+    page_items = indexed_items[page * PICKER_PAGE_SIZE:(page + 1) * PICKER_PAGE_SIZE]
+    for i in range(0, len(page_items), PICKER_COLUMNS):
+        rows.append([InlineKeyboardButton(text=name,
+                                          callback_data=PickerCallback(kind=kind, action=ACTION_SELECT, page=page,
+                                                                       index=index, version=version).pack())
+                     for index, name in page_items[i:i + PICKER_COLUMNS]])
+
+    if pages_count > 1:
+        rows.append([
+            InlineKeyboardButton(text="◀️", callback_data=PickerCallback(kind=kind, action=ACTION_PAGE,
+                                                                        page=(page - 1) % pages_count).pack()),
+            InlineKeyboardButton(text=f"{page + 1}/{pages_count}",
+                                 callback_data=PickerCallback(kind=kind, action=ACTION_NOOP, page=page).pack()),
+            InlineKeyboardButton(text="▶️", callback_data=PickerCallback(kind=kind, action=ACTION_PAGE,
+                                                                        page=(page + 1) % pages_count).pack()),
+        ])
+
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+async def get_state_picker_keyboard(state: FSMContext, kind: str, page: int = 0) -> InlineKeyboardMarkup:
+    data = await state.get_data()
+    location_name = data.get("location_name", None) if kind == KIND_STATION else None
+    return build_picker_keyboard(kind, page, location_name, data.get("picker_prefix", None))
+
+
+async def answer_with_picker(message: Message, state: FSMContext, text: str, kind: str, prefix: str | None = None):
+    if prefix is not None:
+        data = await state.get_data()
+        location_name = data.get("location_name", None) if kind == KIND_STATION else None
+        if not any(name.lower().startswith(prefix.lower()) for name in get_picker_items(kind, location_name)):
+            prefix = None
+
+    await state.update_data(picker_prefix=prefix)
+    await message.answer(text, reply_markup=await get_state_picker_keyboard(state, kind))
+
+
+def resolve_picked_name(callback_data: PickerCallback, state_data: dict) -> str | None:
+    if callback_data.version != get_picker_version(callback_data.kind):
+        return None
+
+    location_name = state_data.get("location_name", None) if callback_data.kind == KIND_STATION else None
+    items = get_picker_items(callback_data.kind, location_name)
+    if not 0 <= callback_data.index < len(items):
+        return None
+    return items[callback_data.index]
+
+
+async def select_picked_item(callback: CallbackQuery, callback_data: PickerCallback, state: FSMContext, handler):
+    name = resolve_picked_name(callback_data, await state.get_data())
+    if name is None:
+        await callback.answer("Список изменился, выберите еще раз")
+        await callback.message.edit_reply_markup(
+            reply_markup=await get_state_picker_keyboard(state, callback_data.kind, callback_data.page))
+        return
+
+    await callback.answer()
+    await callback.message.edit_reply_markup(reply_markup=None)
+    await state.update_data(picker_prefix=None)
+
+    message = callback.message.model_copy(update={"text": name, "from_user": callback.from_user})
+    await handler(message, state)
+
+
+picker_router = Router()
+
+
+@picker_router.callback_query(PickerCallback.filter(F.action == ACTION_PAGE))
+async def turn_picker_page(callback: CallbackQuery, callback_data: PickerCallback, state: FSMContext):
+    await callback.answer()
+    try:
+        await callback.message.edit_reply_markup(
+            reply_markup=await get_state_picker_keyboard(state, callback_data.kind, callback_data.page))
+    except TelegramBadRequest:
+        pass
+
+
+@picker_router.callback_query(PickerCallback.filter(F.action == ACTION_NOOP))
+async def ignore_picker_counter(callback: CallbackQuery):
+    await callback.answer()
+
+
+@picker_router.callback_query(PickerCallback.filter(F.action == ACTION_SELECT))
+async def select_outdated_picker(callback: CallbackQuery):
+    await callback.answer("Этот выбор уже неактуален")
+    await callback.message.edit_reply_markup(reply_markup=None)
@@ -0,0 +1,11 @@
+from loader import game_info
+
+
+async def resolve_user_role(handler, event, data):
+    user = data.get("event_from_user", None)
+    user_id = None if user is None else user.id
+
+    data["is_admin"] = user_id in game_info.admins
+    data["is_caretaker"] = user_id in game_info.caretakers
+    data["station"] = game_info.GetStationByCaretakerID(user_id)
+    return await handler(event, data)
@@ -0,0 +1,36 @@
+from aiogram import Router
+from aiogram.dispatcher.event.handler import CallableObject
+from aiogram.filters import StateFilter
+from aiogram.types import Message
+
+
+def normalize_text(text: str | None) -> str | None:
+    if text is None:
+        return None
+    return " ".join(text.split()).lower()
+
+
+class TextDispatchTable():
+    def __init__(self):
+        self.handlers: dict[str, list[tuple[StateFilter | None, CallableObject]]] = dict()
+
+    def Attach(self, router: Router):
+        router.message.register(self.Dispatch, self.Match)
+
+    def Register(self, text: str, *states):
+        state_filter = StateFilter(*states) if states else None
+
+        def decorator(callback):
+            self.handlers.setdefault(normalize_text(text), []).append((state_filter, CallableObject(callback)))
+            return callback
+
+        return decorator
+
+    async def Match(self, message: Message, raw_state: str | None = None) -> bool | dict:
+        for state_filter, handler in self.handlers.get(normalize_text(message.text), []):
+            if state_filter is None or await state_filter(message, raw_state=raw_state):
+                return {"text_handler": handler}
+        return False
+
+    async def Dispatch(self, message: Message, text_handler: CallableObject, **data):
+        return await text_handler.call(message, **data)
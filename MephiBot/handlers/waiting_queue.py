@@ -0,0 +1,21 @@
+from loader import game_info, logging
+from .notifications import notify_station_caretakers, notify_users
+
+
+async def dispatch_waiting_teams():
+    dispatched = await game_info.ApplyTransition(game_info.DispatchWaitingTeams)
+
+    if len(dispatched) > 0:
+        game_info.update_game_info()
+
+    for team_name, next_station, from_station_name in dispatched:
+        logging.info(f"Команда {team_name} из очереди ожидания отправлена на станцию {next_station.GetName()}")
+
+        notify_station_caretakers(next_station.GetName(), text=f"На вашу станцию направлена команда {team_name}")
+
+        if from_station_name is None:
+            notify_users(game_info.admins,
+                         f"Команда '{team_name}' из очереди ожидания направлена на станцию {next_station.GetName()}.")
+        else:
+            notify_station_caretakers(from_station_name,
+                                      text=f"Команда '{team_name}' из очереди ожидания перенаправлена на станцию {next_station.GetName()}.")
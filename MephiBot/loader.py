@@ -0,0 +1,137 @@
+import logging
+import argparse
+from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.memory import MemoryStorage, SimpleEventIsolation
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+TOKEN = os.environ.get("TOKEN")
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(funcName)s | %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+    handlers=[
+        logging.FileHandler("bot_log.txt"),
+        logging.StreamHandler()
+    ]
+)
+ 
+bot = Bot(token=TOKEN)
+
+parser = argparse.ArgumentParser(
+    description="Запуск бота с заданным файлом кураторов и локаций")
+parser.add_argument('--caretakers-file', type=str,
+                    help='Путь к файлу с данными кураторов', default="users.txt")
+parser.add_argument('--locations-file', type=str,
+                    help='Путь к файлу с данными локаций', default="locations.txt")
+parser.add_argument('--dispatch-policy', type=str,
+                    help='Политика выбора следующей станции для команды',
+                    choices=["first-free", "least-loaded", "fewest-remaining", "random"], default="first-free")
+parser.add_argument('--dispatch-seed', type=int,
+                    help='Seed для политики random', default=None)
+parser.add_argument('--persistence', type=str,
+                    help='Способ сохранения игры: снимок каждые 10 изменений, запись только измененных сущностей, '
+                         'журнал событий со снимками или общее состояние в Valkey для нескольких процессов бота',
+                    choices=["snapshot", "incremental", "eventlog", "shared"], default="snapshot")
+parser.add_argument('--flush-interval-ms', type=int,
+                    help='Максимальная задержка фонового сохранения после изменения, мс', default=500)
+parser.add_argument('--flush-max-changes', type=int,
+                    help='Количество изменений, после которого сохранение выполняется сразу', default=20)
+parser.add_argument('--snapshot-format', type=str,
+                    help='Формат снимков игры', choices=["msgpack", "json"], default="msgpack")
+parser.add_argument('--no-snapshot-compression', action='store_true',
+                    help='Не сжимать снимки игры zlib')
+parser.add_argument('--fallback-dir', type=str,
+                    help='Папка для сохранения игры на диск, пока Valkey недоступен', default=".")
+parser.add_argument('--fsync-interval-ms', type=int,
+                    help='Как часто сбрасывать на диск журнал изменений при работе без Valkey, мс', default=200)
+parser.add_argument('--fsm-storage', type=str,
+                    help='Где хранить состояния диалогов: в Valkey или в памяти процесса',
+                    choices=["valkey", "memory"], default="valkey")
+parser.add_argument('--fsm-ttl', type=int,
+                    help='Через сколько секунд бездействия незавершенный диалог сбрасывается', default=3600)
+parser.add_argument('--mode', type=str,
+                    help='Способ получения обновлений от Telegram', choices=["polling", "webhook"], default="polling")
+parser.add_argument('--webhook-url', type=str,
+                    help='Публичный адрес, на который Telegram будет отправлять обновления, без пути', default=None)
+parser.add_argument('--webhook-path', type=str,
+                    help='Путь, по которому принимаются обновления', default="/webhook")
+parser.add_argument('--webhook-host', type=str,
+                    help='Адрес, на котором слушает сервер webhook', default="0.0.0.0")
+parser.add_argument('--webhook-port', type=int,
+                    help='Порт, на котором слушает сервер webhook', default=8080)
+parser.add_argument('--webhook-secret', type=str,
+                    help='Секрет для заголовка X-Telegram-Bot-Api-Secret-Token, по умолчанию WEBHOOK_SECRET из окружения',
+                    default=os.environ.get("WEBHOOK_SECRET"))
+parser.add_argument('--keep-pending-updates', action='store_true',
+                    help='Не сбрасывать накопившиеся обновления при запуске')
+parser.add_argument('--send-rate', type=float,
+                    help='Сколько сообщений в секунду бот отправляет всего', default=25)
+parser.add_argument('--chat-send-rate', type=float,
+                    help='Сколько сообщений в секунду бот отправляет в один чат', default=1)
+parser.add_argument('--board-debounce-ms', type=int,
+                    help='Минимальный интервал между обновлениями табло станций в миллисекундах', default=1500)
+args = parser.parse_args()
+
+if args.mode == "webhook" and not args.webhook_url:
+    parser.error("для --mode webhook нужно указать --webhook-url")
+
+
+def load_caretakers_from_file(file_path: str) -> dict[int, str]:
+    caretakers = {}
+    with open(file_path, 'r') as f:
+        for line in f:
+            user_id, station_name = line.strip().split()
+            caretakers[int(user_id)] = station_name
+    return caretakers
+
+
+def load_locations_from_file(file_path: str) -> list[tuple[str, int]]:
+    locations = []
+    with open(file_path, 'r') as f:
+        for line in f:
+            location_name, max_users = line.strip().split()
+            locations.append((location_name, int(max_users)))
+    return locations
+
+
+caretakers_data = load_caretakers_from_file(args.caretakers_file)
+location_list_data = load_locations_from_file(args.locations_file)
+
+import valkey.asyncio
+from gameinfo import GameInfo, connection_pool
+from storage import FailoverStorage, FileStorage, ValkeyStorage
+from dispatch_policy import make_dispatch_policy
+from snapshot_writer import SnapshotWriter
+from status_board import StatusBoard
+from fsm_storage import ValkeyFSMStorage
+from outbox import Outbox
+
+if args.fsm_storage == "valkey":
+    storage = ValkeyFSMStorage(valkey.asyncio.Valkey(connection_pool=connection_pool), ttl=args.fsm_ttl)
+else:
+    storage = MemoryStorage()
+dp = Dispatcher(storage=storage, events_isolation=SimpleEventIsolation())
+
+game_info = GameInfo(
+    caretakers=caretakers_data,
+    admins={1094283106, 174924358, 783440088, 593807464},
+    location_list=location_list_data,
+    teams=[], team_on_station=dict(), team_leaving_station=dict()
+)
+game_info.SetDispatchPolicy(make_dispatch_policy(args.dispatch_policy, args.dispatch_seed))
+game_info.SetPersistenceMode(args.persistence)
+game_info.SetSnapshotFormat(args.snapshot_format, not args.no_snapshot_compression)
+if args.persistence == "shared":
+    game_info.SetStorage(ValkeyStorage(game_info.client))
+else:
+    game_info.SetStorage(FailoverStorage(ValkeyStorage(game_info.client),
+                                         FileStorage(args.fallback_dir, args.fsync_interval_ms)))
+snapshot_writer = SnapshotWriter(game_info, args.flush_interval_ms, args.flush_max_changes)
+game_info.SetSnapshotWriter(snapshot_writer)
+outbox = Outbox(bot, args.send_rate, args.chat_send_rate)
+status_board = StatusBoard(bot, game_info, outbox, args.board_debounce_ms)
+game_info.SetStatusBoard(status_board)
+logging.info(f"Политика распределения команд: {game_info.dispatch_policy}")
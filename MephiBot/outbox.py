@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from aiogram import Bot
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+
+MAX_MESSAGE_LENGTH = 4096
+
+
+class TokenBucket():
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def Refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def Delay(self) -> float:
+        self.Refill()
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def Take(self):
+        self.Refill()
+        self.tokens -= 1
+
+    def Pause(self, seconds: float):
+        self.Refill()
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+    async def Acquire(self):
+        while (delay := self.Delay()) > 0:
+            await asyncio.sleep(delay)
+        self.Take()
+
+
+class OutgoingMessage():
+    __slots__ = ("chat_id", "text", "kwargs", "futures", "attempt")
+
+    def __init__(self, chat_id: int, text: str, kwargs: dict, future: asyncio.Future | None = None):
+        self.chat_id = chat_id
+        self.text = text
+        self.kwargs = kwargs
+        self.futures: list[asyncio.Future] = [] if future is None else [future]
+        self.attempt = 0
+
+    def CanMerge(self, other) -> bool:
+        return (not self.kwargs and not other.kwargs
+                and len(self.text) + len(other.text) + 2 <= MAX_MESSAGE_LENGTH)
+
+    def Merge(self, other):
+        self.text += "\n\n" + other.text
+        self.futures.extend(other.futures)
+
+    def IsCancelled(self) -> bool:
+        return len(self.futures) > 0 and all(future.cancelled() for future in self.futures)
+
+    def Resolve(self, result=None, exception: Exception | None = None):
+        for future in self.futures:
+            if future.done():
+                continue
+            if exception is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exception)
+
+
+class DeliveryReport():
+    def __init__(self):
+        self.delivered: list[int] = []
+        self.failed: dict[int, Exception] = dict()
+
+    def IsComplete(self) -> bool:
+        return len(self.failed) == 0
+
+    def GetProcessedCount(self) -> int:
+        return len(self.delivered) + len(self.failed)
+
+    def __repr__(self):
+        return f"DeliveryReport(delivered={self.delivered}, failed={list(self.failed)})"
+
+
+class Outbox():
+    def __init__(self, bot: Bot, global_rate: float = 25, chat_rate: float = 1, chat_burst: float = 3,
+                 workers: int = 4, max_retries: int = 5, retry_backoff: float = 1.0,
+                 fanout_limit: int = 8, fanout_timeout: float = 60.0):
+        self.bot = bot
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.chat_buckets: dict[int, TokenBucket] = dict()
+        self.chat_queues: dict[int, deque[OutgoingMessage]] = dict()
+        self.scheduled: set[int] = set()
+        self.ready: asyncio.Queue[int] = asyncio.Queue()
+        self.workers_count = workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.tasks: list[asyncio.Task] = []
+        self.fanout_semaphore = asyncio.Semaphore(fanout_limit)
+        self.fanout_timeout = fanout_timeout
+
+    def Send(self, chat_id: int, text: str, **kwargs):
+        self.Enqueue(OutgoingMessage(chat_id, text, kwargs))
+
+    async def Deliver(self, chat_id: int, text: str, **kwargs):
+        future = asyncio.get_running_loop().create_future()
+        self.Enqueue(OutgoingMessage(chat_id, text, kwargs, future))
+        return await future
+
+    async def DeliverReported(self, report: DeliveryReport, chat_id: int, text: str, **kwargs):
+        try:
+            async with self.fanout_semaphore:
+                await self.Deliver(chat_id, text, **kwargs)
+        except asyncio.CancelledError:
+            report.failed[chat_id] = TimeoutError("доставка отменена")
+            raise
+        except Exception as e:
+            report.failed[chat_id] = e
+        else:
+            report.delivered.append(chat_id)
+
+    async def Fanout(self, chat_ids, text: str, timeout: float | None = None, **kwargs) -> DeliveryReport:
+        report = DeliveryReport()
+        tasks = [asyncio.create_task(self.DeliverReported(report, chat_id, text, **kwargs))
+                 for chat_id in dict.fromkeys(chat_ids)]
+        if not tasks:
+            return report
+
+        _, pending = await asyncio.wait(tasks, timeout=self.fanout_timeout if timeout is None else timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return report
+
+    def Enqueue(self, message: OutgoingMessage):
+        self.chat_queues.setdefault(message.chat_id, deque()).append(message)
+        if message.chat_id not in self.scheduled:
+            self.scheduled.add(message.chat_id)
+            self.ready.put_nowait(message.chat_id)
+
+    def GetPendingCount(self) -> int:
+        return sum(len(queue) for queue in self.chat_queues.values())
+
+    def GetChatBucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id, None)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    async def Throttle(self, chat_id: int):
+        await self.GetChatBucket(chat_id).Acquire()
+        await self.global_bucket.Acquire()
+
+    def Pause(self, chat_id: int, seconds: float):
+        self.GetChatBucket(chat_id).Pause(seconds)
+        self.global_bucket.Pause(seconds)
+
+    def Reschedule(self, chat_id: int, delay: float):
+        asyncio.get_running_loop().call_later(delay, self.ready.put_nowait, chat_id)
+
+    def DropCancelled(self, chat_id: int):
+        queue = self.chat_queues[chat_id]
+        while queue and queue[0].IsCancelled():
+            queue.popleft()
+
+    def TakeBatch(self, chat_id: int) -> OutgoingMessage:
+        queue = self.chat_queues[chat_id]
+        message = queue.popleft()
+        while queue and (queue[0].IsCancelled() or message.CanMerge(queue[0])):
+            other = queue.popleft()
+            if not other.IsCancelled():
+                message.Merge(other)
+        return message
+
+    async def start(self):
+        if not self.tasks:
+            self.tasks = [asyncio.create_task(self.run()) for _ in range(self.workers_count)]
+            logging.info(f"Очередь исходящих сообщений запущена: {self.global_bucket.rate} сообщений/с всего, "
+                         f"{self.chat_rate} сообщений/с в один чат")
+
+    async def run(self):
+        while True:
+            chat_id = await self.ready.get()
+
+            delay = self.GetChatBucket(chat_id).Delay()
+            if delay > 0:
+                self.Reschedule(chat_id, delay)
+                continue
+
+            await self.global_bucket.Acquire()
+            self.DropCancelled(chat_id)
+            if not self.chat_queues[chat_id]:
+                del self.chat_queues[chat_id]
+                self.scheduled.discard(chat_id)
+                continue
+            self.GetChatBucket(chat_id).Take()
+            message = self.TakeBatch(chat_id)
+            delay = await self.SendMessage(message)
+
+            if delay is not None:
+                self.chat_queues[chat_id].appendleft(message)
+            if self.chat_queues[chat_id]:
+                self.Reschedule(chat_id, delay or 0)
+            else:
+                del self.chat_queues[chat_id]
+                self.scheduled.discard(chat_id)
+
+    async def SendMessage(self, message: OutgoingMessage) -> float | None:
+        try:
+            result = await self.bot.send_message(message.chat_id, message.text, **message.kwargs)
+        except TelegramRetryAfter as e:
+            logging.warning(f"Telegram просит подождать {e.retry_after} с перед отправкой в чат {message.chat_id}")
+            self.Pause(message.chat_id, e.retry_after)
+            return e.retry_after
+        except (TelegramNetworkError, TelegramServerError) as e:
+            message.attempt += 1
+            if message.attempt < self.max_retries:
+                delay = self.retry_backoff * 2 ** (message.attempt - 1)
+                logging.warning(f"Не удалось отправить сообщение в чат {message.chat_id}, "
+                                f"попытка {message.attempt}, повтор через {delay} с: {e}")
+                return delay
+            logging.error(f"Сообщение в чат {message.chat_id} не отправлено после {message.attempt} попыток: {e}")
+            message.Resolve(exception=e)
+        except Exception as e:
+            logging.error(f"Сообщение в чат {message.chat_id} не отправлено: {e}")
+            message.Resolve(exception=e)
+        else:
+            message.Resolve(result)
+        return None
+
+    async def stop(self, timeout: float = 5.0):
+        deadline = time.monotonic() + timeout
+        while self.GetPendingCount() > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        for task in self.tasks:
+            task.cancel()
+        for task in self.tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.tasks = []
+
+        if self.GetPendingCount() > 0:
+            logging.warning(f"Очередь исходящих сообщений остановлена, не отправлено {self.GetPendingCount()} сообщений")
@@ -0,0 +1,74 @@
+import json
+import struct
+import zlib
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MAGIC = b"MBS"
+FORMAT_VERSION = 1
+
+CODEC_JSON = 0
+CODEC_MSGPACK = 1
+CODECS = {"json": CODEC_JSON, "msgpack": CODEC_MSGPACK}
+
+FLAG_ZLIB = 1
+
+# magic, version, codec, flags, crc32 of the stored payload
+HEADER = struct.Struct(">3sBBBI")
+
+
+class SnapshotFormatError(ValueError):
+    pass
+
+
+def encode_snapshot(data: dict, codec: str = "msgpack", compress: bool = True) -> bytes:
+    if codec == "msgpack" and msgpack is None:
+        codec = "json"
+
+    if codec == "msgpack":
+        payload = msgpack.packb(data, use_bin_type=True)
+    elif codec == "json":
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    else:
+        raise SnapshotFormatError(f"Неизвестный формат снимка: {codec}")
+
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload, 1)
+        flags |= FLAG_ZLIB
+
+    return HEADER.pack(MAGIC, FORMAT_VERSION, CODECS[codec], flags, zlib.crc32(payload)) + payload
+
+
+def decode_snapshot(blob: bytes | str) -> dict:
+    if isinstance(blob, str):
+        blob = blob.encode("utf-8")
+
+    if not blob.startswith(MAGIC):
+        return json.loads(blob)
+
+    if len(blob) < HEADER.size:
+        raise SnapshotFormatError("Снимок поврежден: заголовок обрезан")
+
+    _, version, codec, flags, checksum = HEADER.unpack_from(blob)
+    if version > FORMAT_VERSION:
+        raise SnapshotFormatError(f"Неподдерживаемая версия снимка: {version}")
+
+    payload = blob[HEADER.size:]
+    if zlib.crc32(payload) != checksum:
+        raise SnapshotFormatError("Снимок поврежден: контрольная сумма не совпадает")
+
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise SnapshotFormatError("Снимок записан в msgpack, но пакет msgpack не установлен")
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    if codec == CODEC_JSON:
+        return json.loads(payload)
+
+    raise SnapshotFormatError(f"Неизвестный кодек снимка: {codec}")
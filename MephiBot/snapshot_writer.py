@@ -0,0 +1,58 @@
+import asyncio
+import logging
+
+
+class SnapshotWriter():
+    def __init__(self, game_info, flush_interval_ms: int = 500, max_changes: int = 20):
+        self.game_info = game_info
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_changes = max_changes
+        self.dirty = asyncio.Event()
+        self.flush_now = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+    def Notify(self, changes_count: int):
+        self.dirty.set()
+        if changes_count >= self.max_changes:
+            self.flush_now.set()
+
+    async def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+            logging.info(f"Фоновое сохранение запущено: не реже чем раз в {int(self.flush_interval * 1000)} мс "
+                         f"или каждые {self.max_changes} изменений")
+
+    async def run(self):
+        while True:
+            await self.dirty.wait()
+
+            try:
+                await asyncio.wait_for(self.flush_now.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            await self.flush()
+
+    async def flush(self):
+        self.dirty.clear()
+        self.flush_now.clear()
+
+        try:
+            await self.game_info.save_game_info()
+        except Exception:
+            logging.exception("Не удалось сохранить game info, повторная попытка при следующей записи")
+            self.dirty.set()
+            await asyncio.sleep(self.flush_interval)
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+        await self.game_info.save_game_info()
+        await self.game_info.storage.close()
+        logging.info("Финальное сохранение game info выполнено")
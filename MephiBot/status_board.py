@@ -0,0 +1,192 @@
+import asyncio
+import logging
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from gameinfo import StationStatus
+
+MAX_MESSAGE_LENGTH = 4096
+
+STATUS_TEXTS = {
+    StationStatus.FREE: "🟢 Свободна",
+    StationStatus.WAITING: "🟡 Ожидание",
+    StationStatus.IN_PROGRESS: "🔴 В процессе",
+}
+
+
+def render_station_status(game_info) -> list[str]:
+    blocks: list[str] = []
+    for location in sorted(game_info.locations, key=lambda location: location.GetName()):
+        lines = [location.GetName()]
+        for station in location.stations:
+            line = f"- {station.GetName()}: {STATUS_TEXTS.get(station.status, 'Неизвестный статус')}"
+            team_name = game_info.team_on_station.get(station.GetName(), None)
+            if team_name is not None:
+                line += f" ({team_name})"
+            lines.append(line)
+        blocks.append("\n".join(lines))
+    return blocks
+
+
+def split_into_chunks(header: str, blocks: list[str], limit: int = MAX_MESSAGE_LENGTH) -> list[str]:
+    chunks: list[str] = []
+    current = header
+
+    for block in blocks:
+        for part in split_block(block, limit):
+            candidate = f"{current}\n\n{part}" if current else part
+            if len(candidate) <= limit:
+                current = candidate
+                continue
+            chunks.append(current)
+            current = part
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_block(block: str, limit: int) -> list[str]:
+    if len(block) <= limit:
+        return [block]
+
+    parts: list[str] = []
+    current = ""
+    for line in block.split("\n"):
+        line = line[:limit]
+        if current and len(current) + len(line) + 1 > limit:
+            parts.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        parts.append(current)
+    return parts
+
+
+class StatusBoard():
+    def __init__(self, bot: Bot, game_info, outbox, debounce_ms: int = 1500, refresh_interval: float = 30.0):
+        self.bot = bot
+        self.game_info = game_info
+        self.outbox = outbox
+        self.debounce = debounce_ms / 1000
+        self.refresh_interval = refresh_interval
+        self.boards: dict[int, list[int]] = dict()
+        self.shown: dict[int, list[str]] = dict()
+        self.dirty = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.task: asyncio.Task | None = None
+
+    def Notify(self):
+        if self.boards:
+            self.dirty.set()
+
+    def Render(self) -> list[str]:
+        blocks = render_station_status(self.game_info)
+        if len(blocks) == 0:
+            return ["Пока еще не было зарегистрировано ни одной станции."]
+        return split_into_chunks("📍 Состояние станций (обновляется автоматически)", blocks)
+
+    def IsSubscribed(self, chat_id: int) -> bool:
+        return chat_id in self.boards
+
+    async def Subscribe(self, chat_id: int):
+        async with self.lock:
+            for message_id in self.boards.pop(chat_id, []):
+                try:
+                    await self.outbox.Throttle(chat_id)
+                    await self.bot.delete_message(chat_id, message_id)
+                except (TelegramBadRequest, TelegramForbiddenError):
+                    pass
+
+            chunks = self.Render()
+            message_ids = []
+            for chunk in chunks:
+                await self.outbox.Throttle(chat_id)
+                message = await self.bot.send_message(chat_id, chunk)
+                message_ids.append(message.message_id)
+
+            self.boards[chat_id] = message_ids
+            self.shown[chat_id] = chunks
+
+    async def Unsubscribe(self, chat_id: int):
+        async with self.lock:
+            self.boards.pop(chat_id, None)
+            self.shown.pop(chat_id, None)
+
+    async def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+            logging.info(f"Табло станций запущено: обновление не чаще чем раз в {int(self.debounce * 1000)} мс")
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.dirty.wait(), timeout=self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            await asyncio.sleep(self.debounce)
+            self.dirty.clear()
+
+            try:
+                await self.Refresh()
+            except Exception:
+                logging.exception("Не удалось обновить табло станций")
+
+    async def Refresh(self):
+        async with self.lock:
+            if not self.boards:
+                return
+
+            chunks = self.Render()
+            for chat_id in list(self.boards):
+                if self.shown.get(chat_id) != chunks:
+                    await self.UpdateBoard(chat_id, chunks)
+
+    async def UpdateBoard(self, chat_id: int, chunks: list[str]):
+        message_ids = self.boards[chat_id]
+        shown = self.shown[chat_id]
+
+        try:
+            for i, chunk in enumerate(chunks):
+                if i >= len(message_ids):
+                    await self.outbox.Throttle(chat_id)
+                    message = await self.bot.send_message(chat_id, chunk)
+                    message_ids.append(message.message_id)
+                elif i >= len(shown) or shown[i] != chunk:
+                    await self.EditChunk(chat_id, message_ids[i], chunk)
+
+            for message_id in message_ids[len(chunks):]:
+                await self.outbox.Throttle(chat_id)
+                await self.bot.delete_message(chat_id, message_id)
+            del message_ids[len(chunks):]
+        except TelegramRetryAfter as e:
+            logging.warning(f"Telegram просит подождать {e.retry_after} с перед обновлением табло в чате {chat_id}")
+            self.shown[chat_id] = []
+            self.outbox.Pause(chat_id, e.retry_after)
+            self.dirty.set()
+            return
+        except (TelegramBadRequest, TelegramForbiddenError) as e:
+            logging.warning(f"Табло в чате {chat_id} больше нельзя обновлять, подписка снята: {e}")
+            self.boards.pop(chat_id, None)
+            self.shown.pop(chat_id, None)
+            return
+
+        self.shown[chat_id] = chunks
+
+    async def EditChunk(self, chat_id: int, message_id: int, text: str):
+        await self.outbox.Throttle(chat_id)
+        try:
+            await self.bot.edit_message_text(text=text, chat_id=chat_id, message_id=message_id)
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                raise
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
@@ -0,0 +1,515 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import valkey
+import valkey.asyncio
+
+GAME_INFO_KEY = "game_info"
+SAVED_AT_KEY = "game_info:saved_at"
+
+META_KEY = "game_info:meta"
+STATIONS_KEY = "game_info:stations"
+TEAMS_KEY = "game_info:teams"
+TEAM_ON_STATION_KEY = "game_info:team_on_station"
+TEAM_LEAVING_STATION_KEY = "game_info:team_leaving_station"
+VERSION_KEY = "game_info:version"
+HASH_VERSIONS_KEY = "game_info:hash_versions"
+
+ENTITY_KEYS = {
+    "meta": META_KEY,
+    "stations": STATIONS_KEY,
+    "teams": TEAMS_KEY,
+    "team_on_station": TEAM_ON_STATION_KEY,
+    "team_leaving_station": TEAM_LEAVING_STATION_KEY,
+}
+
+EMPTY_SLOT = ""
+
+# KEYS: version, hash versions, changed hashes; ARGV: expected version, changes of each hash
+COMMIT_SCRIPT = """
+local version = redis.call('GET', KEYS[1]) or '0'
+if version ~= ARGV[1] then
+    return false
+end
+version = redis.call('INCR', KEYS[1])
+for i = 3, #KEYS do
+    local fields = cjson.decode(ARGV[i - 1])
+    for name, value in pairs(fields) do
+        redis.call('HSET', KEYS[i], name, value)
+    end
+    redis.call('HSET', KEYS[2], KEYS[i], version)
+end
+return version
+"""
+
+# KEYS: version, hash versions, entity hashes; ARGV: known version of each hash
+# returns the version and a (hash version, fields or 0 if unchanged) pair per hash
+LOAD_CHANGED_SCRIPT = """
+local result = {redis.call('GET', KEYS[1]) or '0'}
+for i = 3, #KEYS do
+    local hash_version = redis.call('HGET', KEYS[2], KEYS[i]) or '0'
+    table.insert(result, hash_version)
+    if hash_version == ARGV[i - 2] then
+        table.insert(result, 0)
+    else
+        table.insert(result, redis.call('HGETALL', KEYS[i]))
+    end
+end
+return result
+"""
+
+STORAGE_ERRORS = (valkey.exceptions.ConnectionError, valkey.exceptions.TimeoutError)
+
+
+class GameStorage():
+    full_sync_needed = False
+
+    async def save_snapshot(self, blob: bytes):
+        raise NotImplementedError
+
+    async def load_snapshot(self) -> bytes | None:
+        raise NotImplementedError
+
+    async def save_changes(self, changes: dict):
+        raise NotImplementedError
+
+    async def load_entities(self) -> dict | None:
+        raise NotImplementedError
+
+    async def saved_at(self) -> float | None:
+        raise NotImplementedError
+
+    def take_full_sync(self) -> bool:
+        full_sync_needed, self.full_sync_needed = self.full_sync_needed, False
+        return full_sync_needed
+
+    async def close(self):
+        pass
+
+
+class ValkeyStorage(GameStorage):
+    def __init__(self, client: valkey.asyncio.Valkey):
+        self.client = client
+
+    async def ping(self):
+        await self.client.ping()
+
+    async def save_snapshot(self, blob: bytes):
+        pipeline = self.client.pipeline(transaction=True)
+        pipeline.set(GAME_INFO_KEY, blob)
+        pipeline.set(SAVED_AT_KEY, time.time())
+        await pipeline.execute()
+
+    async def load_snapshot(self) -> bytes | None:
+        return await self.client.get(GAME_INFO_KEY)
+
+    async def saved_at(self) -> float | None:
+        saved_at = await self.client.get(SAVED_AT_KEY)
+        return None if saved_at is None else float(saved_at)
+
+    async def save_changes(self, changes: dict):
+        pipeline = self.client.pipeline(transaction=True)
+
+        for key, mapping in _encode_changes(changes).items():
+            pipeline.hset(key, mapping=mapping)
+
+        if len(pipeline) > 0:
+            pipeline.set(SAVED_AT_KEY, time.time())
+            await pipeline.execute()
+
+    async def commit_changes(self, changes: dict, expected_version: int) -> int | None:
+        encoded = _encode_changes(changes)
+        return await self.client.eval(COMMIT_SCRIPT, len(encoded) + 2, VERSION_KEY, HASH_VERSIONS_KEY, *encoded,
+                                      expected_version, *[json.dumps(mapping) for mapping in encoded.values()])
+
+    async def get_version(self) -> int:
+        return int(await self.client.get(VERSION_KEY) or 0)
+
+    async def load_entities(self) -> dict | None:
+        return (await self.load_versioned_entities())[0]
+
+    async def load_versioned_entities(self) -> tuple[dict | None, dict[str, int], int]:
+        entities, hash_versions, version = await self.load_changed_entities(dict())
+        if not entities["meta"]:
+            return None, hash_versions, version
+        return _build_game_info_data(**entities), hash_versions, version
+
+    async def load_changed_entities(self, known_versions: dict[str, int]) -> tuple[dict, dict[str, int], int]:
+        names = list(ENTITY_KEYS)
+        version, *replies = await self.client.eval(
+            LOAD_CHANGED_SCRIPT, len(names) + 2, VERSION_KEY, HASH_VERSIONS_KEY, *ENTITY_KEYS.values(),
+            *[known_versions.get(name, EMPTY_SLOT) for name in names])
+
+        entities = dict()
+        hash_versions = dict()
+        for name, hash_version, fields in zip(names, replies[::2], replies[1::2]):
+            hash_versions[name] = int(hash_version)
+            if isinstance(fields, list):
+                entities[name] = _decode_entity(name, {_decode(key): _decode(value)
+                                                       for key, value in zip(fields[::2], fields[1::2])})
+        return entities, hash_versions, int(version)
+
+
+def _decode_entity(name: str, fields: dict[str, str]) -> dict:
+    if name in ("meta", "teams"):
+        return {key: json.loads(value) for key, value in fields.items()}
+    if name in ("team_on_station", "team_leaving_station"):
+        return {station_name: team_name or None for station_name, team_name in fields.items()}
+    return fields
+
+
+def _encode_changes(changes: dict) -> dict[str, dict]:
+    encoded = dict()
+    if changes.get("meta"):
+        encoded[META_KEY] = {key: json.dumps(value) for key, value in changes["meta"].items()}
+    if changes.get("stations"):
+        encoded[STATIONS_KEY] = changes["stations"]
+    if changes.get("teams"):
+        encoded[TEAMS_KEY] = {name: json.dumps(team) for name, team in changes["teams"].items()}
+    if changes.get("team_on_station"):
+        encoded[TEAM_ON_STATION_KEY] = {station_name: EMPTY_SLOT if team_name is None else team_name
+                                        for station_name, team_name in changes["team_on_station"].items()}
+    if changes.get("team_leaving_station"):
+        encoded[TEAM_LEAVING_STATION_KEY] = {station_name: EMPTY_SLOT if team_name is None else team_name
+                                             for station_name, team_name in changes["team_leaving_station"].items()}
+    return encoded
+
+
+def _build_game_info_data(meta: dict, stations: dict, teams: dict, team_on_station: dict,
+                          team_leaving_station: dict) -> dict:
+    return {
+        "caretakers": meta["caretakers"],
+        "admins": meta["admins"],
+        "locations": [
+            {
+                "name": location["name"],
+                "stations": [{"name": station_name, "status": stations[station_name]}
+                             for station_name in location["stations"]]
+            }
+            for location in meta["locations"]
+        ],
+        "teams": [dict(name=name, **team) for name, team in teams.items()],
+        "team_on_station": dict(team_on_station),
+        "team_leaving_station": dict(team_leaving_station),
+        "waiting_teams": meta.get("waiting_teams", {})
+    }
+
+
+def _decode(value) -> str:
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return value
+
+
+CHANGES_PER_COMPACTION = 1000
+
+
+class FileStorage(GameStorage):
+    def __init__(self, directory: str = ".", fsync_interval_ms: int = 200):
+        self.snapshot_path = os.path.join(directory, "game_info.bin")
+        self.changes_path = os.path.join(directory, "game_info.changes")
+        self.fsync_interval = fsync_interval_ms / 1000
+        self.entities: dict[str, dict] | None = None
+        self.changes_file = None
+        self.changes_count = 0
+        self.last_fsync = 0.0
+        self.unsynced = False
+        os.makedirs(directory, exist_ok=True)
+
+    async def save_snapshot(self, blob: bytes):
+        await asyncio.to_thread(_write_atomic, self.snapshot_path, blob)
+
+    async def load_snapshot(self) -> bytes | None:
+        return await asyncio.to_thread(_read_file, self.snapshot_path)
+
+    async def saved_at(self) -> float | None:
+        saved_at = [os.path.getmtime(path) for path in (self.snapshot_path, self.changes_path)
+                    if os.path.exists(path)]
+        return max(saved_at) if saved_at else None
+
+    async def save_changes(self, changes: dict):
+        await asyncio.to_thread(self._save_changes, changes)
+
+    def _save_changes(self, changes: dict):
+        self._load_entities()
+        for key, values in changes.items():
+            self.entities[key].update(values)
+
+        if self.changes_count >= CHANGES_PER_COMPACTION:
+            self._compact()
+            return
+
+        if self.changes_file is None:
+            self.changes_file = open(self.changes_path, "ab")
+        self.changes_file.write(json.dumps(changes, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.changes_file.flush()
+        self.changes_count += 1
+        self.unsynced = True
+
+        if time.monotonic() - self.last_fsync >= self.fsync_interval:
+            self._fsync()
+
+    def _fsync(self):
+        if self.unsynced and self.changes_file is not None:
+            os.fsync(self.changes_file.fileno())
+        self.unsynced = False
+        self.last_fsync = time.monotonic()
+
+    def _compact(self):
+        if self.changes_file is not None:
+            self.changes_file.close()
+            self.changes_file = None
+        _write_atomic(self.changes_path, json.dumps(self.entities, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.changes_count = 1
+        self.unsynced = False
+        self.last_fsync = time.monotonic()
+
+    async def load_entities(self) -> dict | None:
+        entities = await asyncio.to_thread(self._load_entities)
+        if not entities["meta"]:
+            return None
+        return _build_game_info_data(**entities)
+
+    def _load_entities(self) -> dict[str, dict]:
+        if self.entities is not None:
+            return self.entities
+
+        self.entities = {"meta": {}, "stations": {}, "teams": {}, "team_on_station": {}, "team_leaving_station": {}}
+        data = _read_file(self.changes_path)
+        if data is None:
+            return self.entities
+
+        for line in data.splitlines():
+            try:
+                changes = json.loads(line)
+            except ValueError:
+                logging.warning(f"Пропущена поврежденная запись в {self.changes_path}")
+                break
+            for key, values in changes.items():
+                self.entities[key].update(values)
+            self.changes_count += 1
+        return self.entities
+
+    async def close(self):
+        await asyncio.to_thread(self._fsync)
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_file(path: str) -> bytes | None:
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read() or None
+
+
+class FailoverStorage(GameStorage):
+    def __init__(self, primary: ValkeyStorage, fallback: FileStorage, retry_interval: float = 5.0):
+        self.primary = primary
+        self.fallback = fallback
+        self.retry_interval = retry_interval
+        self.active: GameStorage = primary
+        self.failed_at = 0.0
+
+    def _fail_over(self):
+        if self.active is self.primary:
+            logging.warning("Valkey недоступен, game info сохраняются на диск")
+        self.active = self.fallback
+        self.failed_at = time.monotonic()
+        self.full_sync_needed = True
+
+    async def _choose_backend(self) -> GameStorage:
+        if self.active is self.fallback and time.monotonic() - self.failed_at >= self.retry_interval:
+            try:
+                await self.primary.ping()
+            except STORAGE_ERRORS:
+                self.failed_at = time.monotonic()
+            else:
+                logging.info("Valkey снова доступен, game info сохраняются в Valkey")
+                self.active = self.primary
+                self.full_sync_needed = True
+        return self.active
+
+    async def _call(self, method: str, *args):
+        backend = await self._choose_backend()
+        if backend is self.primary:
+            try:
+                return await getattr(self.primary, method)(*args)
+            except STORAGE_ERRORS:
+                self._fail_over()
+        return await getattr(self.fallback, method)(*args)
+
+    async def save_snapshot(self, blob: bytes):
+        await self._call("save_snapshot", blob)
+
+    async def save_changes(self, changes: dict):
+        await self._call("save_changes", changes)
+
+    async def _choose_restore_backend(self) -> GameStorage:
+        try:
+            primary_saved_at = await self.primary.saved_at()
+        except STORAGE_ERRORS:
+            self._fail_over()
+            return self.fallback
+
+        fallback_saved_at = await self.fallback.saved_at()
+        if fallback_saved_at is not None and (primary_saved_at is None or fallback_saved_at > primary_saved_at):
+            logging.warning("Сохранение на диске новее, чем в Valkey, восстановление с диска")
+            self.full_sync_needed = True
+            return self.fallback
+        return self.primary
+
+    async def load_snapshot(self) -> bytes | None:
+        return await (await self._choose_restore_backend()).load_snapshot()
+
+    async def load_entities(self) -> dict | None:
+        return await (await self._choose_restore_backend()).load_entities()
+
+    async def saved_at(self) -> float | None:
+        return await self.active.saved_at()
+
+    async def close(self):
+        await self.fallback.close()
+
+
+EVENTS_STREAM_KEY = "game_info:events"
+EVENTS_SNAPSHOT_KEY = "game_info:event_snapshot"
+EVENTS_STREAM_MAXLEN = 1_000_000
+
+
+class ValkeyEventLog():
+    def __init__(self, client: valkey.asyncio.Valkey):
+        self.client = client
+
+    async def append(self, events: list[dict]) -> str | None:
+        if len(events) == 0:
+            return None
+
+        pipeline = self.client.pipeline(transaction=False)
+        for event in events:
+            pipeline.xadd(EVENTS_STREAM_KEY, {"event": json.dumps(event)},
+                          maxlen=EVENTS_STREAM_MAXLEN, approximate=True)
+        return _decode((await pipeline.execute())[-1])
+
+    async def last_event_id(self) -> str | None:
+        entries = await self.client.xrevrange(EVENTS_STREAM_KEY, count=1)
+        if not entries:
+            return None
+        return _decode(entries[0][0])
+
+    async def read_events(self, after_event_id: str | None) -> list[tuple[str, dict]]:
+        min_id = "-" if after_event_id is None else "(" + after_event_id
+        events = []
+        for event_id, fields in await self.client.xrange(EVENTS_STREAM_KEY, min=min_id):
+            fields = {_decode(key): _decode(value) for key, value in fields.items()}
+            events.append((_decode(event_id), json.loads(fields["event"])))
+        return events
+
+    async def save_snapshot(self, blob: bytes, last_event_id: str | None):
+        await self.client.hset(EVENTS_SNAPSHOT_KEY, mapping={
+            "last_event_id": EMPTY_SLOT if last_event_id is None else last_event_id,
+            "game_info": blob})
+
+    async def load_snapshot(self) -> tuple[bytes, str | None] | None:
+        snapshot = await self.client.hgetall(EVENTS_SNAPSHOT_KEY)
+        if not snapshot:
+            return None
+
+        snapshot = {_decode(key): value for key, value in snapshot.items()}
+        return snapshot["game_info"], _decode(snapshot["last_event_id"]) or None
+
+
+class FileEventLog():
+    def __init__(self, events_path: str = "events.log", snapshot_path: str = "events_snapshot.bin"):
+        self.events_path = events_path
+        self.snapshot_path = snapshot_path
+        self.last_id = self._read_last_id()
+
+    def _read_last_id(self) -> int:
+        last_id = 0
+        if os.path.exists(self.events_path):
+            with open(self.events_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        last_id = int(line.split(" ", 1)[0])
+        return last_id
+
+    async def append(self, events: list[dict]) -> str | None:
+        if len(events) == 0:
+            return None
+        return await asyncio.to_thread(self._append, events)
+
+    def _append(self, events: list[dict]) -> str:
+        lines = []
+        for event in events:
+            self.last_id += 1
+            lines.append(f"{self.last_id} {json.dumps(event, ensure_ascii=False)}\n")
+
+        with open(self.events_path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        return str(self.last_id)
+
+    async def last_event_id(self) -> str | None:
+        return str(self.last_id) if self.last_id > 0 else None
+
+    async def read_events(self, after_event_id: str | None) -> list[tuple[str, dict]]:
+        return await asyncio.to_thread(self._read_events, after_event_id)
+
+    def _read_events(self, after_event_id: str | None) -> list[tuple[str, dict]]:
+        after = 0 if after_event_id is None else int(after_event_id)
+        events = []
+        if not os.path.exists(self.events_path):
+            return events
+
+        with open(self.events_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                event_id, event = line.split(" ", 1)
+                if int(event_id) > after:
+                    events.append((event_id, json.loads(event)))
+        return events
+
+    async def save_snapshot(self, blob: bytes, last_event_id: str | None):
+        await asyncio.to_thread(self._save_snapshot, blob, last_event_id)
+
+    def _save_snapshot(self, blob: bytes, last_event_id: str | None):
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(f"{last_event_id or ''}\n".encode("utf-8"))
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    async def load_snapshot(self) -> tuple[bytes, str | None] | None:
+        return await asyncio.to_thread(self._load_snapshot)
+
+    def _load_snapshot(self) -> tuple[bytes, str | None] | None:
+        if not os.path.exists(self.snapshot_path):
+            return None
+
+        with open(self.snapshot_path, "rb") as f:
+            last_event_id = f.readline().decode("utf-8").strip()
+            blob = f.read()
+        return blob, last_event_id or None
+
+
+async def open_event_log(client: valkey.asyncio.Valkey):
+    try:
+        await client.ping()
+    except valkey.exceptions.ConnectionError:
+        logging.warning("Valkey недоступен, журнал событий пишется в локальный файл")
+        return FileEventLog()
+    return ValkeyEventLog(client)
@@ -0,0 +1,83 @@
+class TrieNode():
+    __slots__ = ("children", "names")
+
+    def __init__(self):
+        self.children: dict[str, TrieNode] = dict()
+        self.names: list[str] = []
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.split()).lower()
+
+
+class TeamNameIndex():
+    def __init__(self, names=()):
+        self.root = TrieNode()
+        self.size = 0
+        for name in names:
+            self.Add(name)
+
+    def Add(self, name: str):
+        node = self.root
+        for char in normalize_name(name):
+            node = node.children.setdefault(char, TrieNode())
+        if name not in node.names:
+            node.names.append(name)
+            self.size += 1
+
+    def FindNode(self, key: str) -> TrieNode | None:
+        node = self.root
+        for char in key:
+            node = node.children.get(char, None)
+            if node is None:
+                return None
+        return node
+
+    def SearchPrefix(self, prefix: str, limit: int) -> list[str]:
+        node = self.FindNode(normalize_name(prefix))
+        if node is None:
+            return []
+
+        result: list[str] = []
+        stack = [node]
+        while stack and len(result) < limit:
+            node = stack.pop()
+            result.extend(node.names[:limit - len(result)])
+            stack.extend(node.children[char] for char in sorted(node.children, reverse=True))
+        return result
+
+    def SearchFuzzy(self, query: str, limit: int, max_distance: int) -> list[tuple[int, str]]:
+        query = normalize_name(query)
+        matches: list[tuple[int, str]] = []
+        first_row = list(range(len(query) + 1))
+
+        stack = [(char, child, first_row) for char, child in self.root.children.items()]
+        while stack:
+            char, node, previous_row = stack.pop()
+
+            row = [previous_row[0] + 1]
+            for i in range(1, len(query) + 1):
+                row.append(min(row[i - 1] + 1,
+                               previous_row[i] + 1,
+                               previous_row[i - 1] + (query[i - 1] != char)))
+
+            if row[-1] <= max_distance:
+                matches.extend((row[-1], name) for name in node.names)
+            if min(row) <= max_distance:
+                stack.extend((next_char, child, row) for next_char, child in node.children.items())
+
+        matches.sort()
+        return matches[:limit]
+
+    def Search(self, query: str, limit: int = 5) -> list[str]:
+        result = self.SearchPrefix(query, limit)
+        if len(result) >= limit:
+            return result
+
+        max_distance = 1 if len(normalize_name(query)) <= 4 else 2
+        for _, name in self.SearchFuzzy(query, limit * 2, max_distance):
+            if name not in result:
+                result.append(name)
+            if len(result) >= limit:
+                break
+        return result